@@ -0,0 +1,39 @@
+# app/concurrency.py
+import asyncio
+from typing import Awaitable, Iterable, Optional
+
+
+async def gather_bounded(
+    awaitables: Iterable[Awaitable],
+    limit: int,
+    timeout: Optional[float] = None,
+    return_exceptions: bool = False,
+) -> list:
+    """
+    Await everything concurrently, at most ``limit`` at a time, each under
+    its own ``timeout`` (seconds). Results keep the input order; with
+    ``return_exceptions`` failures and timeouts come back as exceptions
+    instead of cancelling the rest.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(awaitable):
+        async with semaphore:
+            if timeout is None:
+                return await awaitable
+            return await asyncio.wait_for(awaitable, timeout)
+
+    return await asyncio.gather(
+        *(run(a) for a in awaitables), return_exceptions=return_exceptions
+    )
+
+
+def raise_if_all_failed(results: list, what: str) -> list:
+    """
+    Results of ``gather_bounded(..., return_exceptions=True)``, raising when
+    every call failed: an empty result would look like a real "no match".
+    """
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if results and len(failures) == len(results):
+        raise RuntimeError(f"All {len(results)} {what} failed") from failures[0]
+    return results
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal, Optional
 import logging
 import sys
 
@@ -21,6 +21,50 @@ class Settings(BaseSettings):
     embedding_model: str
     collection_name: str
 
+    # Shared Qdrant client: transport, pool and per-operation timeouts (s)
+    qdrant_prefer_grpc: bool = False
+    qdrant_grpc_port: int = 6334
+    qdrant_pool_size: int = 32
+    qdrant_grpc_keepalive_ms: int = 30000
+    qdrant_timeout: int = 60
+    qdrant_search_timeout: float = 10.0
+    qdrant_scroll_timeout: int = 60
+
+    # Embedding cache: in-memory LRU size, optional SQLite file to persist to
+    embedding_cache_size: int = 2048
+    embedding_cache_path: Optional[str] = None
+
+    # Async embedding micro-batching and Ollama HTTP connection pool
+    embedding_batch_window_ms: float = 5.0
+    embedding_max_batch: int = 32
+    ollama_max_connections: int = 20
+    ollama_keepalive_expiry: float = 60.0
+    # How long Ollama keeps the chat model loaded between requests
+    ollama_keep_alive: str = "30m"
+
+    # /query-address response cache: entries and time to live (s)
+    response_cache_size: int = 1024
+    response_cache_ttl: float = 3600.0
+
+    # Semantic cache: near-duplicate queries (cosine >= threshold) reuse the
+    # address matches, and with semantic_cache_answers the whole response
+    semantic_cache_size: int = 512
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_ttl: float = 3600.0
+    semantic_cache_answers: bool = False
+
+    # Persistent Mplify 150 parse cache: database rows, in-memory LRU entries
+    mplify_cache_size: int = 1_000_000
+    mplify_cache_memory_size: int = 4096
+    # Cache hits whose last_used is written in one transaction
+    mplify_cache_touch_batch: int = 256
+    # How hits become Mplify 150 JSON: "llm", "deterministic" (payload
+    # fields only) or "hybrid" (payload fields, LLM for what is missing)
+    mplify_format_mode: Literal["llm", "deterministic", "hybrid"] = "hybrid"
+    # Hits whose LLM parses are generated at once; at least the largest
+    # top_k (10) so one request's hits are formatted in a single round
+    mplify_format_concurrency: int = 10
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,5 +1,13 @@
 # app/database.py
-from sqlalchemy import create_engine, Column, String, JSON, DateTime, Integer
+from sqlalchemy import (
+    create_engine,
+    Column,
+    String,
+    JSON,
+    DateTime,
+    Integer,
+    UniqueConstraint,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -31,6 +39,20 @@ class ConversationHistory(Base):
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+class MplifyParse(Base):
+    """Cached Mplify 150 parse of one normalized address."""
+
+    __tablename__ = "mplify_parse_cache"
+    __table_args__ = (UniqueConstraint("model", "prompt_version", "address"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    address = Column(String, nullable=False)
+    result = Column(JSON, nullable=False)
+    last_used = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
+
+
 def init_db():
     """Initialize the database tables."""
     Base.metadata.create_all(bind=engine)
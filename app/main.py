@@ -7,6 +7,11 @@ from app.routes.query_route import router as rag_router
 from app.routes.history_route import router as history_router
 from app.config import settings
 from app.database import init_db
+from entity_extractor.relevent_places import get_address_analyzer
+from entity_extractor.search_field import vocabulary_refresher
+from app.services.mplify_cache import mplify_cache
+from vector_db.place_scanner import get_place_scanner
+import asyncio
 import logging
 
 
@@ -34,6 +39,23 @@ async def startup_event():
     logger.info("Initializing database...")
     init_db()
     logger.info("Database initialized successfully")
+    # Build the place scanner before the first query needs it
+    await asyncio.to_thread(get_place_scanner)
+    # Keep field vocabularies fresh without blocking requests
+    vocabulary_refresher.start()
+    # Load the chat model now so the first query doesn't pay for it
+    try:
+        await get_address_analyzer().warm_up()
+        logger.info("Chat model warmed up")
+    except Exception as e:
+        logger.warning(f"Chat model warm-up failed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await vocabulary_refresher.stop()
+    # Keep the recency of the last cache hits for eviction
+    await asyncio.to_thread(mplify_cache.flush)
 
 
 # Include routers
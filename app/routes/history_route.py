@@ -20,8 +20,10 @@ class HistoryResponse(BaseModel):
         from_attributes = True
 
 
+# Plain def: FastAPI runs these in its threadpool, so blocking database
+# calls never hold the event loop
 @router.get("/{session_id}", response_model=List[HistoryResponse])
-async def get_session_history(
+def get_session_history(
     session_id: str, limit: int = Query(default=10, ge=1, le=100)
 ):
     """Retrieve conversation history for a specific session."""
@@ -46,7 +48,7 @@ async def get_session_history(
 
 
 @router.delete("/{session_id}")
-async def clear_session_history(session_id: str):
+def clear_session_history(session_id: str):
     """Clear conversation history for a specific session."""
     db = SessionLocal()
     try:
@@ -1,10 +1,15 @@
 # app/routes/query_route.py
 from fastapi import APIRouter
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 
 from app.schemas import RAGQueryRequest
+from app.config import settings
+from app.services.response_cache import match_cache, normalize_query, response_cache
+from app.services.semantic_cache import semantic_match_cache, semantic_response_cache
+from app.services.embedding_cache import embedding_cache
 from entity_extractor.relevent_places import run_workflow
+from entity_extractor.search_field import aget_embedding
 from llm.model import rag_address_query
 from vector_db.search import vector_search
 
@@ -18,47 +23,132 @@ class MultiMatchResponse(BaseModel):
     )
 
 
-@router.post("", response_model=MultiMatchResponse)
-async def query_address_endpoint(request: RAGQueryRequest):
-    try:
-        # Get best matches
-        merged_best_matches = await run_workflow(request.query)  # returns dict
-        result = merged_best_matches
+async def find_matches(query: str) -> List[Dict[str, Any]]:
+    # Get best matches
+    merged_best_matches = await run_workflow(query)  # returns dict
+    result = merged_best_matches
 
-        # Flatten dicts if needed
-        if isinstance(result, dict):
-            result = [result]  # convert single dict to list
+    # Flatten dicts if needed
+    if isinstance(result, dict):
+        result = [result]  # convert single dict to list
 
-        print("Final Qdrant Results:", result)
+    print("Final Qdrant Results:", result)
+    return result or []
 
-        # Check if any address was detected
-        has_address = bool(
-            result
-            and any(isinstance(item, dict) and item.get("results") for item in result)
-        )
 
-        # If no address detected, have a conversation instead
-        if not has_address:
-            llm_response = rag_address_query("", request.query, request.session_id)
-            return {
-                "llm_response": str(llm_response).strip(),
-                "extracted_address_matches": [],
-            }
+def has_address_matches(result: List[Dict[str, Any]]) -> bool:
+    return bool(
+        result
+        and any(isinstance(item, dict) and item.get("results") for item in result)
+    )
+
 
-        # Fallback vector search if no results but address was detected
-        if not result:
-            results, query_result_array = await vector_search(request.query, 5)
-            result = results + query_result_array  # assuming both are lists
+async def embed_query(query: str) -> Optional[List[float]]:
+    # The semantic caches are an optimisation: without an embedding the
+    # request is simply computed
+    try:
+        return await aget_embedding(query)
+    except Exception as e:
+        print("Query embedding for semantic cache failed:", e)
+        return None
 
-        # Call your RAG/LLM query with address results
-        llm_response = rag_address_query(str(result), request.query, request.session_id)
 
-        # Return properly formatted dict
+async def find_matches_semantic(query: str) -> List[Dict[str, Any]]:
+    vector = await embed_query(query)
+    if vector is not None:
+        cached = semantic_match_cache.get(query, vector)
+        if cached is not None:
+            return cached
+
+    result = await find_matches(query)
+    # Only real matches: an empty result says nothing about similar queries
+    if vector is not None and has_address_matches(result):
+        semantic_match_cache.put(query, vector, result)
+    return result
+
+
+async def answer_query(
+    query: str, result: List[Dict[str, Any]], session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    # Check if any address was detected
+    has_address = has_address_matches(result)
+
+    # If no address detected, have a conversation instead
+    if not has_address:
+        llm_response = await rag_address_query("", query, session_id)
         return {
             "llm_response": str(llm_response).strip(),
-            "extracted_address_matches": result,  # always list of dicts
+            "extracted_address_matches": [],
         }
 
+    # Fallback vector search if no results but address was detected
+    if not result:
+        results, query_result_array = await vector_search(query, 5)
+        result = results + query_result_array  # assuming both are lists
+
+    # Call your RAG/LLM query with address results
+    llm_response = await rag_address_query(str(result), query, session_id)
+
+    # Return properly formatted dict
+    return {
+        "llm_response": str(llm_response).strip(),
+        "extracted_address_matches": result,  # always list of dicts
+    }
+
+
+@router.post("", response_model=MultiMatchResponse)
+async def query_address_endpoint(request: RAGQueryRequest):
+    try:
+        key = normalize_query(request.query)
+
+        async def cached_matches():
+            return await match_cache.get_or_compute(
+                key,
+                lambda: find_matches_semantic(request.query),
+                cacheable=has_address_matches,
+            )
+
+        # The answer depends on the session's history: only the matches
+        # are shared, the answer is generated (and saved) per session
+        if request.session_id:
+            result = await cached_matches()
+            return await answer_query(request.query, result, request.session_id)
+
+        async def compute_response():
+            if not settings.semantic_cache_answers:
+                return await answer_query(request.query, await cached_matches())
+
+            # The embedding cache makes the second embed_query call free
+            vector = await embed_query(request.query)
+            if vector is not None:
+                cached = semantic_response_cache.get(request.query, vector)
+                if cached is not None:
+                    return cached
+
+            response = await answer_query(request.query, await cached_matches())
+            if vector is not None and response["extracted_address_matches"]:
+                semantic_response_cache.put(request.query, vector, response)
+            return response
+
+        # A response without matches may hide a failed search: recompute it
+        return await response_cache.get_or_compute(
+            key,
+            compute_response,
+            cacheable=lambda response: bool(response["extracted_address_matches"]),
+        )
+
     except Exception as e:
         print("Error in query_address_endpoint:", e)
         raise  # re-raise to propagate
+
+
+@router.get("/cache-stats")
+async def cache_stats_endpoint():
+    """Hit rates and sizes of the caches in front of /query-address."""
+    return {
+        "responses": response_cache.stats(),
+        "matches": match_cache.stats(),
+        "semantic_matches": semantic_match_cache.stats(),
+        "semantic_responses": semantic_response_cache.stats(),
+        "embeddings": embedding_cache.stats(),
+    }
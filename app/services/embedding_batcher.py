@@ -0,0 +1,140 @@
+# app/services/embedding_batcher.py
+import asyncio
+import logging
+from typing import Optional
+
+from langchain_ollama import OllamaEmbeddings
+
+from app.config import settings
+from app.services.embedding_cache import EmbeddingCache, embedding_cache, normalize_text
+from app.services.ollama_pool import ollama_async_client_kwargs
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Non-blocking query embedding with cross-request micro-batching.
+
+    Concurrent ``embed`` calls arriving within ``window_ms`` of each other
+    (up to ``max_batch``) are sent to Ollama as one ``embed_documents``
+    request over the embedder's pooled async HTTP client. Identical texts
+    already waiting share one slot, and results land in the shared cache.
+    """
+
+    def __init__(
+        self,
+        embedder: OllamaEmbeddings,
+        model: str,
+        window_ms: float = 5.0,
+        max_batch: int = 32,
+        cache: EmbeddingCache = embedding_cache,
+    ):
+        self.embedder = embedder
+        self.model = model
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.cache = cache
+
+        self._queue: list[tuple[str, str, asyncio.Future]] = []
+        self._pending: dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The loop only holds tasks weakly: keep running flushes alive
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_texts = 0
+
+    async def embed(self, text: str) -> list[float]:
+        vector = self.cache.get(self.model, text)
+        if vector is not None:
+            return vector
+
+        key = normalize_text(text)
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            self._queue.append((key, text, future))
+
+            if len(self._queue) >= self.max_batch:
+                self._schedule_flush(loop, now=True)
+            elif self._flush_handle is None:
+                self._schedule_flush(loop)
+
+        # Shield so one cancelled caller doesn't fail the others sharing it
+        return await asyncio.shield(future)
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop):
+        task = loop.create_task(self._flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, now: bool = False):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if now:
+            self._start_flush(loop)
+        else:
+            self._flush_handle = loop.call_later(self.window, self._start_flush, loop)
+
+    async def _flush(self):
+        self._flush_handle = None
+        batch = self._queue[: self.max_batch]
+        self._queue = self._queue[self.max_batch :]
+        if not batch:
+            return
+        if self._queue:
+            self._schedule_flush(asyncio.get_running_loop(), now=True)
+
+        self.batches += 1
+        self.batched_texts += len(batch)
+        error: BaseException = RuntimeError("Embedding batch returned no vector")
+        try:
+            vectors = await self.embedder.aembed_documents(
+                [text for _, text, _ in batch]
+            )
+            for (key, text, future), vector in zip(batch, vectors):
+                self.cache.put(self.model, text, vector)
+                self._pending.pop(key, None)
+                if not future.done():
+                    future.set_result(vector)
+            logger.debug(f"Embedded batch of {len(batch)} texts with {self.model}")
+        except Exception as e:
+            error = e
+        except BaseException as e:
+            error = RuntimeError(f"Embedding batch interrupted: {e!r}")
+            raise
+        finally:
+            # Whatever got no vector (an error, cancellation, a short reply)
+            # fails now, so later calls don't wait on a stale future
+            for key, _, future in batch:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+                if not future.done():
+                    future.set_exception(error)
+                    # Retrieved, in case every caller has gone
+                    future.exception()
+
+
+_batchers: dict[tuple[Optional[str], str], EmbeddingBatcher] = {}
+
+
+def get_embedding_batcher(base_url: Optional[str], model: str) -> EmbeddingBatcher:
+    """Shared batcher (and HTTP connection pool) per Ollama host and model."""
+    key = (base_url, model)
+    if key not in _batchers:
+        embedder = OllamaEmbeddings(
+            base_url=base_url,
+            model=model,
+            async_client_kwargs=ollama_async_client_kwargs(),
+        )
+        _batchers[key] = EmbeddingBatcher(
+            embedder,
+            model,
+            window_ms=settings.embedding_batch_window_ms,
+            max_batch=settings.embedding_max_batch,
+        )
+    return _batchers[key]
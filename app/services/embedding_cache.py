@@ -0,0 +1,116 @@
+# app/services/embedding_cache.py
+import logging
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Cache-key form of a query: NFC, trimmed, single-spaced."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by (model, normalized text).
+
+    A bounded in-memory LRU sits in front of an optional SQLite file, so
+    identical text is only sent to the embedding model once per process
+    (or once ever, with persistence). Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 2048, persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, text))"
+            )
+            self._db.commit()
+
+    def _remember(self, key: tuple[str, str], vector: list[float]):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[list[float]]:
+        key = (model, normalize_text(text))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND text = ?", key
+                ).fetchone()
+                if row is not None:
+                    vector = array("d", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, vector: list[float]):
+        key = (model, normalize_text(text))
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings (model, text, vector) "
+                        "VALUES (?, ?, ?)",
+                        (*key, array("d", vector).tobytes()),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to persist embedding: {e}")
+
+    def get_or_compute(
+        self, model: str, text: str, compute: Callable[[str], list[float]]
+    ) -> list[float]:
+        vector = self.get(model, text)
+        if vector is None:
+            vector = compute(text)
+            self.put(model, text, vector)
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+# Keep singleton: shared by every embedding call site
+embedding_cache = EmbeddingCache(
+    max_entries=settings.embedding_cache_size,
+    persist_path=settings.embedding_cache_path,
+)
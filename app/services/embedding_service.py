@@ -1,5 +1,6 @@
 from langchain_community.embeddings import OllamaEmbeddings
 from app.config import settings
+from app.services.embedding_cache import embedding_cache
 
 embeddings = OllamaEmbeddings(
     model=settings.embedding_model,
@@ -7,4 +8,6 @@ embeddings = OllamaEmbeddings(
 )
 
 def get_embedding(text: str) -> list[float]:
-    return embeddings.embed_query(text)
\ No newline at end of file
+    return embedding_cache.get_or_compute(
+        settings.embedding_model, text, embeddings.embed_query
+    )
@@ -0,0 +1,300 @@
+# app/services/mplify_cache.py
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import MplifyParse, SessionLocal
+from app.services.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_version(prompt: str) -> str:
+    """Short content hash of a prompt: editing the prompt starts a new cache."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class MplifyCache:
+    """
+    Structured Mplify 150 parses keyed by (model, prompt version, normalized
+    address).
+
+    The parse of a retrieved address is deterministic (temperature 0), so it
+    is generated once and kept in the database; a small in-memory LRU sits
+    in front. The table holds at most ``max_entries`` rows, dropping the
+    least recently used beyond that. Lookups only read the database: hits
+    (in memory or not) are noted and their ``last_used`` written
+    ``touch_batch`` at a time, so recency is approximate between flushes.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1_000_000,
+        memory_entries: int = 4096,
+        touch_batch: int = 256,
+        session_factory=SessionLocal,
+    ):
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.touch_batch = touch_batch
+        self.session_factory = session_factory
+        self._entries: OrderedDict[tuple[str, str, str], Dict[str, Any]] = OrderedDict()
+        self._touched: Dict[tuple[str, str, str], datetime] = {}
+        self._lock = threading.Lock()
+        self._rows: Optional[int] = None  # counted on first write
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: tuple[str, str, str], result: Dict[str, Any]):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.memory_entries:
+            self._entries.popitem(last=False)
+
+    def _touch(self, key: tuple[str, str, str]) -> bool:
+        """Note a hit (under the lock); True once a flush is due."""
+        self._touched[key] = datetime.utcnow()
+        return len(self._touched) >= self.touch_batch
+
+    def get(self, model: str, version: str, address: str) -> Optional[Dict[str, Any]]:
+        key = (model, version, normalize_text(address))
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                flush = self._touch(key)
+        if result is not None:
+            if flush:
+                self.flush()
+            return result
+
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                select(MplifyParse.result).where(
+                    MplifyParse.model == key[0],
+                    MplifyParse.prompt_version == key[1],
+                    MplifyParse.address == key[2],
+                )
+            ).scalar_one_or_none()
+        except Exception as e:
+            logger.warning(f"Mplify cache lookup failed: {e}")
+            return None
+        finally:
+            db.close()
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self._remember(key, result)
+            self.disk_hits += 1
+            flush = self._touch(key)
+        if flush:
+            self.flush()
+        return result
+
+    def _write_touched(self, db):
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+        try:
+            # One executemany on the table, matching rows by their address
+            table = MplifyParse.__table__
+            db.execute(
+                update(table)
+                .where(
+                    table.c.model == bindparam("m"),
+                    table.c.prompt_version == bindparam("v"),
+                    table.c.address == bindparam("a"),
+                )
+                .values(last_used=bindparam("t")),
+                [
+                    {"m": model, "v": version, "a": address, "t": used}
+                    for (model, version, address), used in touched.items()
+                ],
+            )
+            db.commit()
+        except Exception:
+            # Put them back for the next flush, unless newer touches exist
+            with self._lock:
+                for key, used in touched.items():
+                    self._touched.setdefault(key, used)
+            raise
+
+    def flush(self):
+        """Write the ``last_used`` of hits noted since the last flush."""
+        db = self.session_factory()
+        try:
+            self._write_touched(db)
+        except Exception as e:
+            logger.warning(f"Failed to update Mplify cache recency: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def put(self, model: str, version: str, address: str, result: Dict[str, Any]):
+        self.put_many(model, version, {address: result})
+
+    def put_many(self, model: str, version: str, results: Dict[str, Dict[str, Any]]):
+        keyed = {
+            (model, version, normalize_text(address)): result
+            for address, result in results.items()
+        }
+        with self._lock:
+            for key, result in keyed.items():
+                self._remember(key, result)
+
+        db = self.session_factory()
+        try:
+            # Only to keep the row count: a concurrent writer (the prewarm
+            # job) may still insert some of these first, which the upsert
+            # tolerates and the count briefly overstates
+            existing = set(
+                db.execute(
+                    select(MplifyParse.address).where(
+                        MplifyParse.model == model,
+                        MplifyParse.prompt_version == version,
+                        MplifyParse.address.in_([key[2] for key in keyed]),
+                    )
+                ).scalars()
+            )
+            added = sum(1 for key in keyed if key[2] not in existing)
+            now = datetime.utcnow()
+            self._upsert(
+                db,
+                [
+                    {
+                        "model": model,
+                        "prompt_version": version,
+                        "address": address,
+                        "result": result,
+                        "last_used": now,
+                    }
+                    for (_, _, address), result in keyed.items()
+                ],
+            )
+            db.commit()
+
+            with self._lock:
+                for key in keyed:
+                    self._touched.pop(key, None)
+                if self._rows is None:
+                    self._rows = db.execute(
+                        select(func.count()).select_from(MplifyParse)
+                    ).scalar_one()
+                else:
+                    self._rows += added
+                excess = self._rows - self.max_entries
+            if excess > 0:
+                # Recent hits must count before picking what to drop
+                self._write_touched(db)
+                self._evict(db, excess)
+        except Exception as e:
+            logger.warning(f"Failed to persist Mplify parse: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _upsert(db, rows: list[dict]):
+        """Insert ``rows``, replacing the result of rows that already exist."""
+        table = MplifyParse.__table__
+        dialects = {"sqlite": sqlite, "postgresql": postgresql}
+        dialect = dialects.get(db.get_bind().dialect.name)
+        if dialect is not None:
+            statement = dialect.insert(table)
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["model", "prompt_version", "address"],
+                    set_={
+                        "result": statement.excluded.result,
+                        "last_used": statement.excluded.last_used,
+                    },
+                ),
+                rows,
+            )
+            return
+
+        # No native upsert: one row at a time, updating on a conflict
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table).values(**row))
+            except IntegrityError:
+                db.execute(
+                    update(table)
+                    .where(
+                        table.c.model == row["model"],
+                        table.c.prompt_version == row["prompt_version"],
+                        table.c.address == row["address"],
+                    )
+                    .values(result=row["result"], last_used=row["last_used"])
+                )
+
+    def _evict(self, db, count: int):
+        oldest = (
+            select(MplifyParse.id).order_by(MplifyParse.last_used).limit(count)
+        ).scalar_subquery()
+        deleted = (
+            db.query(MplifyParse)
+            .filter(MplifyParse.id.in_(oldest))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        with self._lock:
+            self._rows -= deleted
+        logger.debug(f"Evicted {deleted} cached Mplify parses")
+
+    def missing(self, model: str, version: str, addresses: Iterable[str]) -> list[str]:
+        """The addresses (as given) that have no cached parse yet."""
+        by_key = {normalize_text(address): address for address in addresses}
+        if not by_key:
+            return []
+        db = self.session_factory()
+        try:
+            cached = set(
+                db.execute(
+                    select(MplifyParse.address).where(
+                        MplifyParse.model == model,
+                        MplifyParse.prompt_version == version,
+                        MplifyParse.address.in_(list(by_key)),
+                    )
+                ).scalars()
+            )
+        finally:
+            db.close()
+        return [address for key, address in by_key.items() if key not in cached]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "memory_size": len(self._entries),
+            "pending_touches": len(self._touched),
+            "rows": self._rows,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+# Keep singleton: shared by rag_service and the prewarm job
+mplify_cache = MplifyCache(
+    max_entries=settings.mplify_cache_size,
+    memory_entries=settings.mplify_cache_memory_size,
+    touch_batch=settings.mplify_cache_touch_batch,
+)
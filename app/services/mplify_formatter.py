@@ -0,0 +1,250 @@
+# app/services/mplify_formatter.py
+"""
+Mplify 150 Fielded Address Representation built directly from the structured
+Qdrant payload (street_name, locality, town, postcode, region, house numbers
+and normalized_address), without an LLM.
+"""
+
+import re
+import string
+from typing import Any, Dict, List, Optional, Tuple
+
+COUNTRY_CODE = "NZ"  # ISO 3166
+LANGUAGE_CODE = "EN"  # ISO 639
+
+# Street type spellings -> the full type name
+STREET_TYPES = {
+    "aly": "Alley",
+    "alley": "Alley",
+    "ave": "Avenue",
+    "avenue": "Avenue",
+    "blvd": "Boulevard",
+    "boulevard": "Boulevard",
+    "cl": "Close",
+    "close": "Close",
+    "ct": "Court",
+    "court": "Court",
+    "cres": "Crescent",
+    "crescent": "Crescent",
+    "dr": "Drive",
+    "drive": "Drive",
+    "esp": "Esplanade",
+    "esplanade": "Esplanade",
+    "gr": "Grove",
+    "grove": "Grove",
+    "hwy": "Highway",
+    "highway": "Highway",
+    "lane": "Lane",
+    "ln": "Lane",
+    "pde": "Parade",
+    "parade": "Parade",
+    "pl": "Place",
+    "place": "Place",
+    "quay": "Quay",
+    "rd": "Road",
+    "road": "Road",
+    "sq": "Square",
+    "square": "Square",
+    "st": "Street",
+    "street": "Street",
+    "tarn": "Tarn",
+    "tce": "Terrace",
+    "terrace": "Terrace",
+    "way": "Way",
+    "wharf": "Wharf",
+}
+
+DIRECTIONS = {
+    "n": "North",
+    "north": "North",
+    "s": "South",
+    "south": "South",
+    "e": "East",
+    "east": "East",
+    "w": "West",
+    "west": "West",
+}
+# A leading "North" is part of NZ street names ("North Road", "West Coast
+# Road"); only the abbreviations are a pre-direction
+PRE_DIRECTIONS = {"n": "North", "s": "South", "e": "East", "w": "West"}
+
+# Sub unit spellings -> Mplify 150 sub unit type
+SUB_UNIT_TYPES = {
+    "apartment": "UNIT",
+    "apt": "UNIT",
+    "berth": "BERTH",
+    "flat": "FLAT",
+    "level": "LEVEL",
+    "lvl": "LEVEL",
+    "pier": "PIER",
+    "room": "ROOM",
+    "shop": "SHOP",
+    "suite": "SUITE",
+    "tower": "TOWER",
+    "unit": "UNIT",
+}
+
+# "Flat 2, ", "Level 2 ": any number of these lead the street number
+_SUB_UNIT_PATTERN = re.compile(
+    r"\s*(?P<unit_type>" + "|".join(SUB_UNIT_TYPES) + r")\.?\s+"
+    r"(?P<unit_name>[0-9A-Za-z]+)\s*,?",
+    re.IGNORECASE,
+)
+# "14A-16 Queen Street", "2/14 Queen Street", "14 Queen Street"
+_NUMBER_PATTERN = re.compile(
+    r"\s*(?:(?P<slash_unit>[0-9A-Za-z]+)\s*/\s*)?"
+    r"(?P<number>\d+)\s*(?P<suffix>[A-Za-z])?"
+    r"(?:\s*-\s*(?P<last>\d+)\s*(?P<last_suffix>[A-Za-z])?)?\b",
+    re.IGNORECASE,
+)
+_PO_BOX_PATTERN = re.compile(r"\b(?:PO|P\.O\.)\s*Box\s+(\d+)", re.IGNORECASE)
+
+# Output key order, as in the prompt's example
+FIELD_ORDER = (
+    "street_number",
+    "street_number_suffix",
+    "street_number_last",
+    "street_number_last_suffix",
+    "street_pre_direction",
+    "street_name",
+    "street_type",
+    "street_post_direction",
+    "po_box_number",
+    "locality",
+    "city",
+    "postal_code",
+    "state_or_province",
+    "country",
+    "language",
+    "sub_units",
+)
+
+# Without these the representation is incomplete and (in hybrid mode) the
+# LLM fills them in
+REQUIRED_FIELDS = ("street_number", "street_name", "city")
+
+
+def _display(value: Optional[str]) -> Optional[str]:
+    """Payload values are upper case; "HAWKE'S BAY" -> "Hawke's Bay"."""
+    value = (value or "").strip()
+    return string.capwords(value.lower()) if value else None
+
+
+def _postcode(value) -> Optional[str]:
+    value = str(value or "").strip()
+    # NZ postcodes are four digits; stored as numbers they lose a leading 0
+    if value.isdigit() and len(value) < 4:
+        value = value.zfill(4)
+    return value or None
+
+
+def split_street(street: str) -> Dict[str, str]:
+    """
+    "N Queen St East" -> street_pre_direction North, street_name Queen,
+    street_type Street, street_post_direction East. Tokens are only taken
+    as a type or direction while a street name remains.
+    """
+    tokens = (street or "").split()
+    fields = {}
+
+    if len(tokens) > 1 and tokens[-1].lower().rstrip(".") in DIRECTIONS:
+        if tokens[-2].lower().rstrip(".") in STREET_TYPES and len(tokens) > 2:
+            fields["street_post_direction"] = DIRECTIONS[
+                tokens.pop().lower().rstrip(".")
+            ]
+    if len(tokens) > 1 and tokens[-1].lower().rstrip(".") in STREET_TYPES:
+        fields["street_type"] = STREET_TYPES[tokens.pop().lower().rstrip(".")]
+    if len(tokens) > 1 and tokens[0].lower().rstrip(".") in PRE_DIRECTIONS:
+        fields["street_pre_direction"] = PRE_DIRECTIONS[
+            tokens.pop(0).lower().rstrip(".")
+        ]
+
+    if tokens:
+        fields["street_name"] = _display(" ".join(tokens))
+    return fields
+
+
+def split_number(
+    address: str,
+) -> Tuple[Dict[str, str], List[Dict[str, str]], str]:
+    """
+    Street number fields and sub units from the start of an address, and
+    the rest of its first comma-separated part (usually the street).
+    """
+    address = address or ""
+    sub_units = []
+    position = 0
+    # "Unit 3 Level 2, 5 Main Rd": each leading sub unit in turn
+    while True:
+        unit = _SUB_UNIT_PATTERN.match(address, position)
+        if unit is None:
+            break
+        sub_units.append(
+            {
+                "sub_unit_type": SUB_UNIT_TYPES[unit.group("unit_type").lower()],
+                "sub_unit_name": unit.group("unit_name").upper(),
+            }
+        )
+        position = unit.end()
+
+    match = _NUMBER_PATTERN.match(address, position)
+    if match is None:
+        return {}, [], ""
+    street = address[match.end() :].split(",", 1)[0].strip()
+
+    fields = {"street_number": match.group("number")}
+    if match.group("suffix"):
+        fields["street_number_suffix"] = match.group("suffix").upper()
+    if match.group("last"):
+        fields["street_number_last"] = match.group("last")
+        if match.group("last_suffix"):
+            fields["street_number_last_suffix"] = match.group("last_suffix").upper()
+
+    if match.group("slash_unit"):
+        # NZ "2/14 Queen Street" is unit 2 of number 14
+        sub_units.append(
+            {
+                "sub_unit_type": "UNIT",
+                "sub_unit_name": match.group("slash_unit").upper(),
+            }
+        )
+    return fields, sub_units, street
+
+
+def format_payload(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Mplify 150 fields derivable from a Qdrant payload, and the required
+    fields that could not be derived.
+    """
+    address = (payload.get("normalized_address") or "").strip()
+    structured: Dict[str, Any] = {}
+
+    po_box = _PO_BOX_PATTERN.search(address)
+    if po_box:
+        structured["po_box_number"] = po_box.group(1)
+        sub_units = []
+    else:
+        number_fields, sub_units, street = split_number(address)
+        if not number_fields and payload.get("house_low") is not None:
+            number_fields = {"street_number": str(payload["house_low"])}
+            house_high = payload.get("house_high")
+            if house_high is not None and house_high != payload["house_low"]:
+                number_fields["street_number_last"] = str(house_high)
+        structured.update(number_fields)
+        structured.update(split_street(payload.get("street_name") or street))
+
+    optional = {
+        "locality": _display(payload.get("locality")),
+        "city": _display(payload.get("town")),
+        "postal_code": _postcode(payload.get("postcode")),
+        "state_or_province": _display(payload.get("region")),
+    }
+    structured.update({name: value for name, value in optional.items() if value})
+    structured["country"] = COUNTRY_CODE
+    structured["language"] = LANGUAGE_CODE
+    structured["sub_units"] = sub_units
+
+    required = ("city",) if po_box else REQUIRED_FIELDS
+    missing = [name for name in required if not structured.get(name)]
+    ordered = {name: structured[name] for name in FIELD_ORDER if name in structured}
+    return ordered, missing
@@ -0,0 +1,25 @@
+# app/services/ollama_pool.py
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+_async_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+
+def ollama_async_client_kwargs() -> dict:
+    """
+    httpx kwargs for Ollama async clients. Every client built with them
+    shares one keep-alive connection pool instead of opening its own.
+    """
+    global _async_transport
+    if _async_transport is None:
+        _async_transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.ollama_max_connections,
+                max_keepalive_connections=settings.ollama_max_connections,
+                keepalive_expiry=settings.ollama_keepalive_expiry,
+            )
+        )
+    return {"transport": _async_transport}
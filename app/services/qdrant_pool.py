@@ -0,0 +1,45 @@
+# app/services/qdrant_pool.py
+import math
+from functools import lru_cache
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from app.config import settings
+
+
+def _client_kwargs() -> dict:
+    kwargs = dict(
+        url=settings.qdrant_url,
+        api_key=settings.qdrant_api_key,
+        timeout=settings.qdrant_timeout,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        grpc_port=settings.qdrant_grpc_port,
+        pool_size=settings.qdrant_pool_size,
+    )
+    if settings.qdrant_prefer_grpc:
+        kwargs["grpc_options"] = {
+            "grpc.keepalive_time_ms": settings.qdrant_grpc_keepalive_ms,
+            "grpc.keepalive_permit_without_calls": 1,
+            "grpc.max_receive_message_length": 64 * 1024 * 1024,
+        }
+    return kwargs
+
+
+def server_timeout(seconds: float) -> int:
+    """Qdrant's per-request ``timeout`` is whole seconds: round up."""
+    return max(1, math.ceil(seconds))
+
+
+@lru_cache(maxsize=None)
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    The process-wide async Qdrant client. Every module shares its
+    connection pool (gRPC channels when QDRANT_PREFER_GRPC is set).
+    """
+    return AsyncQdrantClient(**_client_kwargs())
+
+
+@lru_cache(maxsize=None)
+def get_qdrant_client() -> QdrantClient:
+    """Sync counterpart for code that cannot await, with the same settings."""
+    return QdrantClient(**_client_kwargs())
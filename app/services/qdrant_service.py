@@ -1,16 +1,11 @@
 # app/services/qdrant_service.py
-from qdrant_client import QdrantClient
 from app.config import settings
+from app.services.qdrant_pool import get_qdrant_client
 
 
 class QdrantService:
     def __init__(self):
-        self.client = QdrantClient(
-            host=settings.qdrant_host,
-            port=settings.qdrant_port,
-            api_key=settings.qdrant_api_key,
-            timeout=60,
-        )
+        self.client = get_qdrant_client()
         self.collection_name = settings.collection_name
         # Auto-detect client version and pick correct method
         self._use_modern_search = hasattr(self.client, "search")
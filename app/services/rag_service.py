@@ -5,6 +5,8 @@ from langchain_ollama import ChatOllama
 from langchain_core.output_parsers import JsonOutputParser
 from app.services.embedding_service import get_embedding
 from app.services.qdrant_service import qdrant_service
+from app.services.mplify_cache import mplify_cache, prompt_version
+from app.services.mplify_formatter import format_payload
 from app.config import settings
 from app.database import ConversationHistory, SessionLocal
 from typing import List, Dict, Any, Optional
@@ -108,32 +110,112 @@ prompt = PromptTemplate.from_template(MPLIFY_150_PROMPT)
 parser = JsonOutputParser()
 chain = prompt | llm | parser
 
+# Cached parses are only reused with the exact prompt they came from
+MPLIFY_PROMPT_VERSION = prompt_version(MPLIFY_150_PROMPT)
 
-def get_conversation_history(session_id: str, limit: int = 5) -> str:
-    """Retrieve recent conversation history for a session."""
-    db = SessionLocal()
-    try:
-        history = (
-            db.query(ConversationHistory)
-            .filter(ConversationHistory.session_id == session_id)
-            .order_by(ConversationHistory.timestamp.desc())
-            .limit(limit)
-            .all()
-        )
 
-        if not history:
-            return ""
+def format_inputs(raw_address: str) -> Dict[str, str]:
+    # Without history: the parse of a retrieved address is the same for
+    # every session, which is what lets it be cached
+    return {
+        "retrieved_address": raw_address,
+        "conversation_history": "No previous conversation.",
+    }
 
-        # Format history for context (most recent first, so reverse)
-        history_text = []
-        for record in reversed(history):
-            history_text.append(f"User Query: {record.query}")
-            if isinstance(record.response, dict):
-                history_text.append(f"Response: {record.response}")
 
-        return "\n".join(history_text[-10:])  # Last 10 lines max
-    finally:
-        db.close()
+def parse_addresses(raw_addresses: List[str]) -> Dict[str, Any]:
+    """
+    Mplify 150 LLM parse of each distinct address: cached parses are looked
+    up, the rest generated concurrently (at most ``mplify_format_concurrency``
+    at a time) and cached. Failed parses map to their exception.
+    """
+    parsed: Dict[str, Any] = {}
+    todo = []
+    for raw_address in dict.fromkeys(raw_addresses):
+        cached = mplify_cache.get(
+            settings.chat_model, MPLIFY_PROMPT_VERSION, raw_address
+        )
+        if cached is not None:
+            parsed[raw_address] = cached
+        else:
+            todo.append(raw_address)
+
+    if todo:
+        outputs = chain.batch(
+            [format_inputs(raw_address) for raw_address in todo],
+            config={"max_concurrency": settings.mplify_format_concurrency},
+            return_exceptions=True,
+        )
+        generated = {}
+        for raw_address, output in zip(todo, outputs):
+            if not isinstance(output, (dict, Exception)):
+                output = ValueError(f"Expected a JSON object, got {output!r}")
+            parsed[raw_address] = output
+            if isinstance(output, dict):
+                generated[raw_address] = output
+        if generated:
+            mplify_cache.put_many(settings.chat_model, MPLIFY_PROMPT_VERSION, generated)
+    return parsed
+
+
+def format_address(raw_address: str) -> Dict[str, Any]:
+    """Mplify 150 parse of a retrieved address, generated once and cached."""
+    structured = parse_addresses([raw_address])[raw_address]
+    if isinstance(structured, Exception):
+        raise structured
+    return structured
+
+
+def format_hits(payloads: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Mplify 150 representation of each search hit, in order, per
+    ``mplify_format_mode``: ``llm`` parses normalized_address with the LLM,
+    ``deterministic`` maps the payload fields, and ``hybrid`` maps them and
+    asks the LLM only for required fields the payload cannot supply. The
+    LLM parses all hits need are made together; a hit whose parse failed
+    comes back as the exception.
+    """
+    mode = settings.mplify_format_mode
+    planned = []
+    for payload in payloads:
+        raw_address = payload.get("normalized_address", "").strip()
+        if mode == "llm":
+            planned.append((raw_address, None, None))
+        else:
+            structured, missing = format_payload(payload)
+            planned.append((raw_address, structured, missing))
+
+    needs_llm = [
+        raw_address
+        for raw_address, structured, missing in planned
+        if structured is None or (missing and mode == "hybrid")
+    ]
+    parsed = parse_addresses(needs_llm) if needs_llm else {}
+
+    formatted = []
+    for raw_address, structured, missing in planned:
+        if structured is None:
+            formatted.append(parsed[raw_address])
+            continue
+        if raw_address in parsed:
+            llm_fields = parsed[raw_address]
+            if isinstance(llm_fields, dict):
+                for name in missing:
+                    if llm_fields.get(name):
+                        structured[name] = llm_fields[name]
+            else:
+                # The payload fields are still a usable answer
+                logger.warning(f"LLM parse for {missing} failed: {llm_fields}")
+        formatted.append(structured)
+    return formatted
+
+
+def format_hit(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """format_hits for a single hit; raises if its parse failed."""
+    structured = format_hits([payload])[0]
+    if isinstance(structured, Exception):
+        raise structured
+    return structured
 
 
 def save_to_history(
@@ -174,13 +256,6 @@ def rag_address_query(
         f"RAG Query: '{partial_address}' | top_k={top_k} | session={session_id}"
     )
 
-    # Get conversation history if session_id provided
-    history_context = ""
-    if session_id:
-        history_context = get_conversation_history(session_id, limit=3)
-        if history_context:
-            logger.debug(f"Retrieved conversation history for session {session_id}")
-
     query_vector = get_embedding(partial_address)
     hits = qdrant_service.search(
         vector=query_vector, top_k=top_k + 2, score_threshold=0.70
@@ -191,38 +266,37 @@ def rag_address_query(
             save_to_history(session_id, partial_address, {"error": "no_results"})
         return []
 
-    results = []
-    for hit in hits[:top_k]:  # Respect user's top_k
-        payload = hit.payload
-        raw_address = payload.get("normalized_address", "").strip()
-        if not raw_address:
-            continue
-
-        try:
-            structured = chain.invoke(
-                {
-                    "retrieved_address": raw_address,
-                    "conversation_history": history_context
-                    or "No previous conversation.",
-                }
-            )
-            result = {"score": round(float(hit.score), 4), "address": structured}
-            results.append(result)
+    hits = [
+        hit
+        for hit in hits[:top_k]  # Respect user's top_k
+        if hit.payload.get("normalized_address", "").strip()
+    ]
+    # Formatted together, so the LLM calls for all hits overlap
+    formatted = format_hits([hit.payload for hit in hits])
 
-            # Save first result to history
-            if session_id and len(results) == 1:
-                save_to_history(
-                    session_id, partial_address, structured, score=str(result["score"])
-                )
-
-        except Exception as e:
-            logger.warning(f"Failed to parse one result: {e}")
+    results = []
+    for hit, structured in zip(hits, formatted):
+        score = round(float(hit.score), 4)
+        if isinstance(structured, Exception):
+            logger.warning(f"Failed to parse one result: {structured}")
             # Still include raw version as fallback
+            raw_address = hit.payload.get("normalized_address", "").strip()
             results.append(
                 {
-                    "score": round(float(hit.score), 4),
+                    "score": score,
                     "address": {"raw_address": raw_address, "error": "parsing_failed"},
                 }
             )
+        else:
+            results.append({"score": score, "address": structured})
+
+    # Save first result to history
+    if session_id and results and not isinstance(formatted[0], Exception):
+        save_to_history(
+            session_id,
+            partial_address,
+            results[0]["address"],
+            score=str(results[0]["score"]),
+        )
 
     return results
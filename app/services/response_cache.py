@@ -0,0 +1,128 @@
+# app/services/response_cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.config import settings
+from app.services.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Cache-key form of a user query: normalized text without case."""
+    return normalize_text(query).casefold()
+
+
+def _retrieve_exception(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()
+
+
+class ResponseCache:
+    """
+    Results of expensive async computations, keyed by normalized query.
+
+    Entries expire after ``ttl`` seconds and the least recently used are
+    evicted beyond ``max_entries``. Concurrent misses for the same key are
+    coalesced: one task computes, every caller awaits its result. Only
+    values passing ``cacheable`` (by default: non-empty ones) are cached.
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or everything when no key is given."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = bool,
+    ) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # Its own task, so no single caller's cancellation (a client
+            # disconnecting) cancels it for everyone else waiting on it
+            task = asyncio.ensure_future(self._compute(key, compute, cacheable))
+            # Waiters each get the exception through the shield; this marks it
+            # retrieved when every one of them was cancelled first
+            task.add_done_callback(_retrieve_exception)
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool],
+    ):
+        try:
+            value = await compute()
+            # Empty results may come from failures upstream; don't pin them
+            if value is not None and cacheable(value):
+                self.put(key, value)
+            return value
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "size": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+# Keep singletons: whole responses for sessionless queries, and the address
+# matches alone, which don't depend on the session and are reused by both
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_size, ttl=settings.response_cache_ttl
+)
+match_cache = ResponseCache(
+    max_entries=settings.response_cache_size, ttl=settings.response_cache_ttl
+)
@@ -0,0 +1,178 @@
+# app/services/semantic_cache.py
+import re
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.response_cache import normalize_query
+from vector_db.place_scanner import get_place_scanner, tokenize
+
+_NUMBER = re.compile(r"\d+")
+
+
+def number_signature(query: str) -> tuple[str, ...]:
+    """
+    The numbers in a query (house numbers, postcodes). "12 Queen St" and
+    "14 Queen St" embed almost identically but are different addresses, so
+    entries only match queries with the same numbers.
+    """
+    return tuple(sorted(_NUMBER.findall(query)))
+
+
+def place_signature(query: str) -> frozenset:
+    """
+    The known places a query names. "Queen St Hamilton" and "Queen St
+    Auckland" can be more similar than the threshold, so entries only match
+    queries naming the same places (typos folded to the place they mean).
+    Without a place scanner every word counts.
+    """
+    scanner = get_place_scanner()
+    if scanner is None:
+        return frozenset(token for token, _, _ in tokenize(query))
+    return frozenset(mention.value for mention in scanner.scan(query))
+
+
+def query_signature(query: str) -> tuple:
+    """What must be equal, besides the embedding, for a cache hit."""
+    return number_signature(query), place_signature(query)
+
+
+class SemanticCache:
+    """
+    Values for recently answered queries, found by embedding similarity.
+
+    Query embeddings are kept normalized in one preallocated numpy matrix,
+    so a lookup is a single matrix-vector product over at most
+    ``max_entries`` rows. A lookup hits when the most similar live entry
+    with the same numbers and places reaches ``threshold`` (cosine). Entries expire
+    after ``ttl`` seconds; when full, the least recently used is replaced.
+    """
+
+    def __init__(
+        self, max_entries: int = 512, threshold: float = 0.95, ttl: float = 3600.0
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+
+        self._vectors: Optional[np.ndarray] = None  # allocated on first put
+        self._used = np.zeros(max_entries)  # last use, for LRU
+        self._expires = np.zeros(max_entries)
+        self._queries: list[Optional[str]] = [None] * max_entries
+        self._signatures: list[Optional[tuple]] = [None] * max_entries
+        self._values: list[Any] = [None] * max_entries
+        self._slots: dict[str, int] = {}  # normalized query -> slot
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else None
+
+    def get(self, query: str, vector) -> Optional[Any]:
+        unit = self._unit(vector)
+        if (
+            unit is None
+            or self._size == 0
+            or self._vectors is None
+            or unit.shape[0] != self._vectors.shape[1]
+        ):
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        signature = query_signature(query)
+        similarities = self._vectors[: self._size] @ unit
+        # Best first, stopping at the threshold
+        for slot in np.argsort(-similarities):
+            if similarities[slot] < self.threshold:
+                break
+            if self._expires[slot] < now:
+                continue
+            if self._signatures[slot] != signature:
+                continue
+            self._used[slot] = now
+            self.hits += 1
+            print(
+                f"Semantic cache hit: {query!r} ~ {self._queries[slot]!r} "
+                f"({similarities[slot]:.3f})"
+            )
+            return self._values[slot]
+
+        self.misses += 1
+        return None
+
+    def _free_slot(self, now: float) -> int:
+        if self._size < self.max_entries:
+            self._size += 1
+            return self._size - 1
+        expired = np.flatnonzero(self._expires < now)
+        if len(expired):
+            self.expirations += 1
+            return int(expired[0])
+        self.evictions += 1
+        return int(np.argmin(self._used))
+
+    def put(self, query: str, vector, value: Any):
+        unit = self._unit(vector)
+        if unit is None or self.max_entries <= 0:
+            return
+        if self._vectors is None or unit.shape[0] != self._vectors.shape[1]:
+            # First entry, or the embedding model changed
+            self._vectors = np.zeros((self.max_entries, unit.shape[0]), np.float32)
+            self.clear()
+
+        now = time.monotonic()
+        normalized = normalize_query(query)
+        slot = self._slots.get(normalized)
+        if slot is None:
+            slot = self._free_slot(now)
+            self._slots.pop(self._queries[slot], None)
+            self._slots[normalized] = slot
+
+        self._vectors[slot] = unit
+        self._used[slot] = now
+        self._expires[slot] = now + self.ttl
+        self._queries[slot] = normalized
+        self._signatures[slot] = query_signature(query)
+        self._values[slot] = value
+
+    def clear(self):
+        self._size = 0
+        self._slots = {}
+        self._queries = [None] * self.max_entries
+        self._signatures = [None] * self.max_entries
+        self._values = [None] * self.max_entries
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Keep singletons: address matches for every request, and (when enabled)
+# whole responses for sessionless requests
+semantic_match_cache = SemanticCache(
+    max_entries=settings.semantic_cache_size,
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.semantic_cache_ttl,
+)
+semantic_response_cache = SemanticCache(
+    max_entries=settings.semantic_cache_size if settings.semantic_cache_answers else 0,
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.semantic_cache_ttl,
+)
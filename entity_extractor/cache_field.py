@@ -1,19 +1,226 @@
-import json
 import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import Counter
+from typing import Callable, Generic, Iterable, Mapping, Optional, TypeVar
 
-def save_field_to_single_json(field_name: str, data, json_file="fields.json"):
-    # If JSON file exists → load it
-    if os.path.exists(json_file):
-        with open(json_file, "r", encoding="utf-8") as f:
-            existing_data = json.load(f)
-    else:
-        existing_data = {}
+import portalocker
 
-    # Add or update field data
-    existing_data[field_name] = data
+# -------------------
+# Vocabulary store file format (little-endian)
+#
+#   header   magic, format version, generation, string count, field count
+#   strings  (string count + 1) u32 offsets, then the utf-8 blob; every
+#            distinct string is stored once, whichever fields use it
+#   fields   per field: name id, value count, byte offset of its arrays,
+#            has-counts flag
+#   arrays   per field: u32 string ids, then u32 point counts (optional)
+#
+# The points behind each ValueCounts field are kept in one more field,
+# _POINTS_FIELD ({field name: points}), hidden from readers.
+#
+# Every process reads the whole store into its own vocabularies: the fuzzy
+# matcher needs each value as a Python string, so the file is not mapped
+# and shared between workers.
+# -------------------
+STORE_MAGIC = b"ADDRVOC\x00"
+STORE_VERSION = 1
+_HEADER = struct.Struct("<8sIQII")
+_FIELD = struct.Struct("<IIII")
+_POINTS_FIELD = "\x00points"
 
-    # Save back to the same file
-    with open(json_file, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, indent=4, ensure_ascii=False)
 
-    print(f"Updated {json_file} with field '{field_name}'")
+class ValueCounts(Counter):
+    """
+    Point count per value of one field, and ``points``: how many points
+    have the field at all. A point holding a list of values counts once in
+    ``points`` but once per value above, so the two totals can differ.
+    """
+
+    def __init__(self, *args, points: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.points = points
+
+
+def _u32_array(values) -> array:
+    arr = array("I", values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def write_vocabulary_store(
+    fields: Mapping[str, Iterable], path: str, generation: int = 1
+):
+    """
+    Atomically write ``fields`` (field -> values, or field -> {value: count})
+    to ``path``: the file is written next to the target and renamed over it,
+    so readers see either the old store or the new one.
+    """
+    points = {
+        name: values.points
+        for name, values in fields.items()
+        if isinstance(values, ValueCounts) and values.points is not None
+    }
+    if points:
+        fields = {**fields, _POINTS_FIELD: points}
+
+    strings: dict[str, int] = {}
+
+    def intern(s: str) -> int:
+        return strings.setdefault(s, len(strings))
+
+    entries = []
+    for name, values in fields.items():
+        counts = None
+        if isinstance(values, Mapping):
+            counts = [int(n) for n in values.values()]
+            values = values.keys()
+        ids = [intern(str(v)) for v in values]
+        entries.append((intern(name), ids, counts))
+
+    blob = bytearray()
+    offsets = [0]
+    for s in strings:
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+
+    header_size = _HEADER.size + 4 * len(offsets) + len(blob)
+    field_table_size = _FIELD.size * len(entries)
+    position = header_size + field_table_size
+
+    field_table = bytearray()
+    arrays = bytearray()
+    for name_id, ids, counts in entries:
+        field_table += _FIELD.pack(name_id, len(ids), position, counts is not None)
+        chunk = _u32_array(ids).tobytes()
+        if counts is not None:
+            chunk += _u32_array(counts).tobytes()
+        arrays += chunk
+        position += len(chunk)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".vocab-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    STORE_MAGIC, STORE_VERSION, generation, len(strings), len(entries)
+                )
+            )
+            f.write(_u32_array(offsets).tobytes())
+            f.write(blob)
+            f.write(field_table)
+            f.write(arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _u32_list(data: bytes, start: int, count: int) -> array:
+    arr = array("I")
+    arr.frombytes(data[start : start + 4 * count])
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _read_store(path: str) -> tuple[int, dict]:
+    """The generation and every field of the store file at ``path``."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    magic, version, generation, string_count, field_count = _HEADER.unpack_from(data, 0)
+    if magic != STORE_MAGIC:
+        raise ValueError(f"{path} is not a vocabulary store")
+    if version != STORE_VERSION:
+        raise ValueError(f"Unsupported vocabulary store version {version}")
+
+    position = _HEADER.size
+    offsets = _u32_list(data, position, string_count + 1)
+    position += 4 * (string_count + 1)
+    blob = data[position : position + offsets[-1]]
+    position += offsets[-1]
+    strings = [
+        sys.intern(blob[offsets[i] : offsets[i + 1]].decode("utf-8"))
+        for i in range(string_count)
+    ]
+
+    fields = {}
+    for _ in range(field_count):
+        name_id, count, start, has_counts = _FIELD.unpack_from(data, position)
+        position += _FIELD.size
+        values = [strings[i] for i in _u32_list(data, start, count)]
+        if has_counts:
+            counts = _u32_list(data, start + 4 * count, count)
+            fields[strings[name_id]] = dict(zip(values, counts))
+        else:
+            fields[strings[name_id]] = values
+
+    points = fields.pop(_POINTS_FIELD, {})
+    for name, values in fields.items():
+        if isinstance(values, dict):
+            fields[name] = ValueCounts(values, points=points.get(name))
+    return generation, fields
+
+
+def read_vocabulary_store(path: str) -> dict:
+    """
+    Load every field of the store at ``path`` ({} if it does not exist):
+    field -> values, or field -> ValueCounts when counts were stored.
+    """
+    if not os.path.exists(path):
+        return {}
+    return _read_store(path)[1]
+
+
+def update_vocabulary_store(fields: Mapping[str, Iterable], path: str):
+    """
+    Merge ``fields`` into the store at ``path``. A lock file serialises
+    writers across worker processes so concurrent updates are not lost.
+    """
+    with portalocker.Lock(path + ".lock", timeout=60):
+        existing = {}
+        generation = 0
+        if os.path.exists(path):
+            generation, existing = _read_store(path)
+        existing.update(fields)
+        write_vocabulary_store(existing, path, generation=generation + 1)
+
+    print(f"Updated {path} with fields {list(fields)}")
+
+
+T = TypeVar("T")
+
+
+class StoreBackedRegistry(Generic[T]):
+    """
+    Holds one index derived from the collection (house number ranges, the
+    gazetteer). It is loaded from ``store_file`` on first use and replaced
+    by a single reference swap when rebuilt.
+    """
+
+    def __init__(self, store_file: str, load: Callable[[str], T]):
+        self.store_file = store_file
+        self._load = load
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+
+    def get(self) -> T:
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._load(self.store_file)
+                value = self._value
+        return value
+
+    def publish(self, value: T) -> None:
+        self._value = value
@@ -0,0 +1,151 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from qdrant_client.models import FieldCondition, Filter, MatchText, MatchValue, Range
+
+from entity_extractor.house_numbers import HOUSE_NUMBER_FIELDS, parse_house_number
+from entity_extractor.vocabulary import VocabularyRegistry, vocabulary_registry
+
+# How each payload field is indexed (see vector_db/ingest.py); house numbers
+# have integer indexes
+FULL_TEXT_INDEX_FIELDS = ("locality", "town")
+KEYWORD_INDEX_FIELDS = ("postcode", "region")
+
+# Rough share of points carrying any given house number
+HOUSE_NUMBER_SELECTIVITY = 0.01
+
+
+@dataclass
+class PlannedCondition:
+    field_name: str
+    value: str
+    score: float
+    # The value is stored verbatim in the collection, so it can match exactly
+    exact: bool
+    # Estimated fraction of points that pass this condition
+    selectivity: float
+    # False when the gazetteer says the value contradicts another field
+    consistent: bool = True
+
+    def field_conditions(self) -> list[FieldCondition]:
+        if self.field_name in HOUSE_NUMBER_FIELDS:
+            # The queried number (or "low-high" range) has to overlap the
+            # point's house_low..house_high
+            low, _, high = self.value.partition("-")
+            return [
+                FieldCondition(key="house_low", range=Range(lte=int(high or low))),
+                FieldCondition(key="house_high", range=Range(gte=int(low))),
+            ]
+        if not self.exact:
+            return [
+                FieldCondition(key=self.field_name, match=MatchText(text=self.value))
+            ]
+
+        conditions = [
+            FieldCondition(key=self.field_name, match=MatchValue(value=self.value))
+        ]
+        if self.field_name in FULL_TEXT_INDEX_FIELDS:
+            # Only the full-text index covers this field; let it narrow the
+            # candidates before the exact check
+            conditions.insert(
+                0, FieldCondition(key=self.field_name, match=MatchText(text=self.value))
+            )
+        return conditions
+
+
+@dataclass
+class FilterVariant:
+    conditions: list[PlannedCondition]
+    dropped: list[str] = field(default_factory=list)
+
+    @property
+    def filter(self) -> Optional[Filter]:
+        must = [c for pc in self.conditions for c in pc.field_conditions()]
+        return Filter(must=must) if must else None
+
+
+def _plan_house_number(filter_dict: dict) -> Optional[PlannedCondition]:
+    """One range condition for house_low and house_high together."""
+    numbers = []
+    scores = []
+    for field_name in HOUSE_NUMBER_FIELDS:
+        val = filter_dict.get(field_name)
+        if not isinstance(val, dict):
+            continue
+        number = parse_house_number(val.get("best_match"))
+        if number is not None:
+            numbers.append(number)
+            scores.append(val.get("score") or 0)
+    if not numbers:
+        return None
+    low, high = min(numbers), max(numbers)
+    value = str(low) if low == high else f"{low}-{high}"
+    return PlannedCondition(
+        "house_low", value, min(scores), True, HOUSE_NUMBER_SELECTIVITY
+    )
+
+
+def _plan_condition(
+    field_name: str, value: str, score: float, registry: VocabularyRegistry
+) -> Optional[PlannedCondition]:
+    vocabulary = registry.get(field_name)
+    if vocabulary is None or len(vocabulary) == 0:
+        return PlannedCondition(field_name, value, score, False, 1.0)
+
+    exact = value in vocabulary
+    frequency = vocabulary.frequency(value) if exact else None
+    total = vocabulary.point_count
+    if frequency and total:
+        selectivity = frequency / total
+    else:
+        # No counts: assume values are spread evenly
+        selectivity = 1 / len(vocabulary)
+    return PlannedCondition(field_name, value, score, exact, selectivity)
+
+
+def plan_filter(
+    filter_dict: dict,
+    registry: VocabularyRegistry = vocabulary_registry,
+    min_conditions: int = 1,
+) -> list[FilterVariant]:
+    """
+    Turn fuzzy-match results ({field: {"best_match", "score", ...}}) into
+    filter variants, tightest first.
+
+    The first variant has every condition, most selective first. Each
+    following one drops the least reliable remaining condition: values the
+    gazetteer flagged as inconsistent first, then inexact values, lower
+    match scores, and among equals the most selective, since a single wrong
+    rare value (a mistyped postcode) is what usually empties the result.
+    Relaxation stops at ``min_conditions``.
+    """
+    planned = []
+    house_number = _plan_house_number(filter_dict)
+    if house_number is not None:
+        planned.append(house_number)
+    for key, val in filter_dict.items():
+        if key in HOUSE_NUMBER_FIELDS:
+            continue
+        if not isinstance(val, dict) or val.get("best_match") in (None, ""):
+            continue
+        pc = _plan_condition(
+            key, str(val["best_match"]), val.get("score") or 0, registry
+        )
+        if pc is not None:
+            pc.consistent = val.get("consistent", True)
+            planned.append(pc)
+    planned.sort(key=lambda pc: pc.selectivity)
+
+    variants = [FilterVariant(planned)]
+    drop_order = sorted(
+        planned, key=lambda pc: (pc.consistent, pc.exact, pc.score, pc.selectivity)
+    )
+    remaining = list(planned)
+    dropped = []
+    for pc in drop_order:
+        if len(remaining) <= max(1, min_conditions):
+            break
+        remaining = [c for c in remaining if c is not pc]
+        dropped = dropped + [pc.field_name]
+        variants.append(FilterVariant(remaining, dropped))
+    return variants
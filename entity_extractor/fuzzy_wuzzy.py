@@ -1,5 +1,6 @@
 from fuzzywuzzy import fuzz, process
 from entity_extractor.model import Address
+from entity_extractor.vocabulary import FieldVocabulary
 from dataclasses import dataclass
 
 
@@ -61,17 +62,32 @@ def fuzzy_match_address(
     best_global_score = 0
     best_from_query = None
 
+    # Fast path: most inputs only differ by case, punctuation, macrons,
+    # spacing or abbreviations, which the canonical-key table absorbs
+    if isinstance(candidate_values, FieldVocabulary):
+        for qv in query_values:
+            exact = candidate_values.canonical_lookup(qv)
+            if exact is not None:
+                return exact, 100, qv
+
     for qv in query_values:
-        match, score = process.extractOne(
-            qv, candidate_values, scorer=fuzz.WRatio  # BEST overall fuzzy scorer
-        )
+        if isinstance(candidate_values, FieldVocabulary):
+            # Only scores the few values that can reach the threshold
+            best = candidate_values.ngram_index.extract_one(qv, threshold)
+        else:
+            best = process.extractOne(
+                qv, candidate_values, scorer=fuzz.WRatio  # BEST overall fuzzy scorer
+            )
+        if best is None:
+            continue
+        match, score = best
 
         if score > best_global_score:
             best_global_score = score
             best_global_match = match
             best_from_query = qv
 
-    if best_global_score >= 98:
+    if best_global_score >= threshold:
         return best_global_match, best_global_score, best_from_query
 
     return None, 0, None
@@ -0,0 +1,183 @@
+import logging
+import os
+from collections import Counter
+from itertools import combinations
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from qdrant_client import AsyncQdrantClient
+
+from entity_extractor.cache_field import (
+    StoreBackedRegistry,
+    read_vocabulary_store,
+    write_vocabulary_store,
+)
+from entity_extractor.vocabulary import FieldVocabulary
+from entity_extractor.vocabulary_builder import scan_collection
+
+logger = logging.getLogger(__name__)
+
+# Broadest first: matching resolves fields in this order
+GAZETTEER_LEVELS = ("region", "town", "locality", "postcode")
+
+# Separates the levels of a combination in the store
+_SEPARATOR = "\x1f"
+_SUBTREE_CACHE_SIZE = 4096
+
+
+def _level_value(value) -> str:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return "" if value is None else str(value)
+
+
+class Gazetteer:
+    """
+    Which (region, town, locality, postcode) combinations exist, with point
+    counts. Answers "which towns are in this region", "which localities
+    share this postcode" and so on, in any direction.
+    """
+
+    __slots__ = ("_combos", "_counts", "_index", "_subtrees", "point_count")
+
+    def __init__(
+        self, combos: Mapping[tuple[str, ...], int], point_count: Optional[int] = None
+    ):
+        self._combos = tuple(combos)
+        self._counts = tuple(combos.values())
+        # Points scanned when built; None if unknown
+        self.point_count = point_count
+
+        index = {level: {} for level in GAZETTEER_LEVELS}
+        for i, combo in enumerate(self._combos):
+            for level, value in zip(GAZETTEER_LEVELS, combo):
+                if value:
+                    index[level].setdefault(value, []).append(i)
+        self._index = MappingProxyType(
+            {
+                level: {value: frozenset(ids) for value, ids in values.items()}
+                for level, values in index.items()
+            }
+        )
+        self._subtrees: dict[tuple, FieldVocabulary] = {}
+
+    def __len__(self) -> int:
+        return len(self._combos)
+
+    def items(self):
+        return zip(self._combos, self._counts)
+
+    def _matching(self, constraints: Mapping[str, str]) -> frozenset:
+        ids = None
+        for level, value in constraints.items():
+            found = self._index[level].get(value, frozenset())
+            ids = found if ids is None else ids & found
+        return ids if ids is not None else frozenset()
+
+    def subtree(
+        self, field_name: str, resolved: Mapping[str, str]
+    ) -> Optional[FieldVocabulary]:
+        """
+        Values of ``field_name`` that occur together with every resolved
+        field, with point counts. None when nothing constrains the field.
+        """
+        constraints = {
+            level: str(value)
+            for level, value in resolved.items()
+            if level in GAZETTEER_LEVELS and level != field_name and value
+        }
+        if field_name not in GAZETTEER_LEVELS or not constraints or not self._combos:
+            return None
+
+        key = (field_name, tuple(sorted(constraints.items())))
+        vocabulary = self._subtrees.get(key)
+        if vocabulary is None:
+            position = GAZETTEER_LEVELS.index(field_name)
+            counts = Counter()
+            for i in self._matching(constraints):
+                value = self._combos[i][position]
+                if value:
+                    counts[value] += self._counts[i]
+            vocabulary = FieldVocabulary(field_name, counts)
+            if len(self._subtrees) >= _SUBTREE_CACHE_SIZE:
+                self._subtrees.clear()
+            self._subtrees[key] = vocabulary
+        return vocabulary
+
+    def conflicts(self, resolved: Mapping[str, str]) -> list[tuple[str, str]]:
+        """Pairs of resolved fields whose values never occur together."""
+        known = [
+            (level, str(resolved[level]))
+            for level in GAZETTEER_LEVELS
+            if resolved.get(level) and str(resolved[level]) in self._index[level]
+        ]
+        return [
+            (a, b)
+            for (a, va), (b, vb) in combinations(known, 2)
+            if not self._index[a][va] & self._index[b][vb]
+        ]
+
+
+async def build_gazetteer(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    page_size: int = 1000,
+    workers: int = 4,
+    timeout: Optional[int] = None,
+) -> Gazetteer:
+    """Scan the collection for every region/town/locality/postcode combination."""
+
+    def visit(state: dict, payload: dict):
+        state["points"] += 1
+        combo = tuple(_level_value(payload.get(level)) for level in GAZETTEER_LEVELS)
+        if any(combo):
+            state["combos"][combo] += 1
+
+    partials, stats = await scan_collection(
+        client,
+        collection_name,
+        GAZETTEER_LEVELS,
+        new_state=lambda: {"combos": Counter(), "points": 0},
+        visit=visit,
+        page_size=page_size,
+        workers=workers,
+        timeout=timeout,
+    )
+
+    combos = Counter()
+    for partial in partials:
+        combos.update(partial["combos"])
+
+    logger.info(f"Built gazetteer with {len(combos)} combinations: {stats}")
+    return Gazetteer(combos, point_count=sum(p["points"] for p in partials))
+
+
+# -------------------
+# Persistence (same binary format as the vocabulary store)
+# -------------------
+def save_gazetteer(gazetteer: Gazetteer, path: str):
+    write_vocabulary_store(
+        {
+            "combinations": {
+                _SEPARATOR.join(combo): count for combo, count in gazetteer.items()
+            },
+            "points": {"all": gazetteer.point_count or 0},
+        },
+        path,
+    )
+
+
+def load_gazetteer(path: str) -> Gazetteer:
+    if not os.path.exists(path):
+        return Gazetteer({})
+    stored = read_vocabulary_store(path)
+    combos = {
+        tuple(key.split(_SEPARATOR)): count
+        for key, count in stored.get("combinations", {}).items()
+    }
+    return Gazetteer(combos, stored.get("points", {}).get("all"))
+
+
+gazetteer_registry: StoreBackedRegistry[Gazetteer] = StoreBackedRegistry(
+    "gazetteer.vocab", load_gazetteer
+)
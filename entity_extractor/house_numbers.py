@@ -0,0 +1,218 @@
+import logging
+import os
+import re
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from qdrant_client import AsyncQdrantClient
+
+from entity_extractor.cache_field import (
+    StoreBackedRegistry,
+    read_vocabulary_store,
+    write_vocabulary_store,
+)
+from entity_extractor.vocabulary import canonical_key
+from entity_extractor.vocabulary_builder import scan_collection
+
+logger = logging.getLogger(__name__)
+
+HOUSE_NUMBER_FIELDS = ("house_low", "house_high")
+# Ranges are kept per street within a town, and per street name across all
+# towns for queries whose town is unknown
+STREET_FIELD = "street_name"
+TOWN_FIELD = "town"
+
+_HOUSE_NUMBER = re.compile(r"\d+")
+
+
+def parse_house_number(value) -> Optional[int]:
+    """Leading number of a house number ("12A" -> 12), or None."""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    match = _HOUSE_NUMBER.search(str(value))
+    return int(match.group()) if match else None
+
+
+def street_key(street: Optional[str], town: Optional[str] = None) -> Optional[str]:
+    """Range key for a street ("King St" == "KING STREET"), optionally in a town."""
+    street = canonical_key(street or "")
+    if not street:
+        return None
+    return f"{street}|{canonical_key(town or '')}"
+
+
+class HouseNumberRanges:
+    """
+    Lowest house_low and highest house_high seen for each street (street
+    name within a town, and street name across towns; see ``street_key``).
+    """
+
+    __slots__ = ("_ranges", "point_count")
+
+    def __init__(
+        self,
+        ranges: Mapping[str, tuple[int, int]],
+        point_count: Optional[int] = None,
+    ):
+        self._ranges = MappingProxyType(dict(ranges))
+        # Points with a house number when built; None if unknown
+        self.point_count = point_count
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def items(self):
+        return self._ranges.items()
+
+    def get(self, key: Optional[str]) -> Optional[tuple[int, int]]:
+        return self._ranges.get(key) if key else None
+
+    def street_range(
+        self, street: Optional[str], town: Optional[str] = None
+    ) -> Optional[tuple[int, int]]:
+        """Range of ``street`` in ``town``, else across every town."""
+        bounds = self.get(street_key(street, town)) if town else None
+        return bounds if bounds is not None else self.get(street_key(street))
+
+    def check(
+        self, street: Optional[str], number: int, town: Optional[str] = None
+    ) -> Optional[bool]:
+        """Whether ``number`` is within the street's range; None if unknown."""
+        bounds = self.street_range(street, town)
+        if bounds is None:
+            return None
+        low, high = bounds
+        return low <= number <= high
+
+
+async def build_house_ranges(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    page_size: int = 1000,
+    workers: int = 4,
+    timeout: Optional[int] = None,
+) -> HouseNumberRanges:
+    """Scan the collection for the house number range of every street."""
+
+    def visit(state: dict, payload: dict):
+        low = parse_house_number(payload.get("house_low"))
+        if low is None:
+            return
+        high = parse_house_number(payload.get("house_high"))
+        high = low if high is None else max(low, high)
+        state["points"] += 1
+
+        street = payload.get(STREET_FIELD)
+        keys = {street_key(street), street_key(street, payload.get(TOWN_FIELD))}
+        for key in keys - {None}:
+            bounds = state["ranges"].get(key)
+            if bounds is None:
+                state["ranges"][key] = [low, high]
+            else:
+                bounds[0] = min(bounds[0], low)
+                bounds[1] = max(bounds[1], high)
+
+    partials, stats = await scan_collection(
+        client,
+        collection_name,
+        [STREET_FIELD, TOWN_FIELD, *HOUSE_NUMBER_FIELDS],
+        new_state=lambda: {"ranges": {}, "points": 0},
+        visit=visit,
+        page_size=page_size,
+        workers=workers,
+        timeout=timeout,
+    )
+
+    ranges: dict[str, list[int]] = {}
+    for partial in partials:
+        for key, (low, high) in partial["ranges"].items():
+            bounds = ranges.setdefault(key, [low, high])
+            bounds[0] = min(bounds[0], low)
+            bounds[1] = max(bounds[1], high)
+
+    logger.info(f"Built house number ranges for {len(ranges)} street keys: {stats}")
+    return HouseNumberRanges(
+        {key: (low, high) for key, (low, high) in ranges.items()},
+        point_count=sum(partial["points"] for partial in partials),
+    )
+
+
+def match_house_number(
+    values: list[str],
+    street: Optional[str],
+    ranges: HouseNumberRanges,
+    town: Optional[str] = None,
+) -> dict:
+    """
+    Pick the parsed house number to filter on, validated against the range
+    of ``street`` (in ``town`` when known). Shaped like a fuzzy match
+    result; a number outside the street's range is reported but left out of
+    the filter (best_match None).
+    """
+    unchecked = None
+    rejected = None
+    for value in values:
+        number = parse_house_number(value)
+        if number is None:
+            continue
+        in_range = ranges.check(street, number, town)
+        if in_range:
+            return {"original": value, "best_match": number, "score": 100}
+        if in_range is None and unchecked is None:
+            # Street unknown: keep the number, but trust it less
+            unchecked = {"original": value, "best_match": number, "score": 90}
+        elif in_range is False and rejected is None:
+            rejected = {
+                "original": value,
+                "best_match": None,
+                "score": 0,
+                "out_of_range": ranges.street_range(street, town),
+            }
+
+    if unchecked is not None:
+        return unchecked
+    if rejected is not None:
+        print(
+            f"House number {rejected['original']} is outside {street}'s range "
+            f"{rejected['out_of_range']}"
+        )
+        return rejected
+    return {"original": values[0] if values else None, "best_match": None, "score": 0}
+
+
+# -------------------
+# Persistence (same binary format as the vocabulary store)
+# -------------------
+# Bumped when the range keys change; older stores are ignored (and so
+# rebuilt by the refresher)
+RANGES_FORMAT = 2
+
+
+def save_house_ranges(ranges: HouseNumberRanges, path: str):
+    write_vocabulary_store(
+        {
+            "house_low": {key: low for key, (low, _) in ranges.items()},
+            "house_high": {key: high for key, (_, high) in ranges.items()},
+            "points": {"house_low": ranges.point_count or 0, "format": RANGES_FORMAT},
+        },
+        path,
+    )
+
+
+def load_house_ranges(path: str) -> HouseNumberRanges:
+    if not os.path.exists(path):
+        return HouseNumberRanges({})
+    stored = read_vocabulary_store(path)
+    if stored.get("points", {}).get("format") != RANGES_FORMAT:
+        logger.info(f"Ignoring {path}: written by an older version")
+        return HouseNumberRanges({})
+    lows, highs = stored.get("house_low", {}), stored.get("house_high", {})
+    ranges = {key: (lows[key], highs[key]) for key in lows if key in highs}
+    return HouseNumberRanges(ranges, stored.get("points", {}).get("house_low"))
+
+
+house_range_registry: StoreBackedRegistry[HouseNumberRanges] = StoreBackedRegistry(
+    "house_ranges.vocab", load_house_ranges
+)
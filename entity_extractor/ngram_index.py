@@ -0,0 +1,97 @@
+from collections import Counter, defaultdict
+from typing import Optional, Sequence
+
+from fuzzywuzzy import fuzz, process, utils
+
+NGRAM_SIZE = 3
+
+# fuzz.WRatio caps its token/partial branches at 95, so above this score a
+# match can only come from the plain ratio of the two normalized strings.
+# That is what makes n-gram pruning exact for the matcher's threshold.
+MIN_PRUNABLE_THRESHOLD = 96
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> Counter:
+    """Padded character n-grams of ``text`` with their multiplicities."""
+    padded = " " * (n - 1) + text + " " * (n - 1)
+    return Counter(padded[i : i + n] for i in range(len(padded) - n + 1))
+
+
+class NgramIndex:
+    """
+    Character n-gram inverted index over a field vocabulary.
+
+    ``extract_one`` returns the same (match, score) that
+    ``process.extractOne(query, values, scorer=fuzz.WRatio)`` would for any
+    match scoring at or above ``threshold``, but only scores the handful of
+    values that share enough n-grams with the query to possibly get there.
+
+    The bound: WRatio >= t (t >= 96) needs ratio = 1 - d / (a + b) >= t,
+    where d is the insert/delete distance of the normalized strings.
+    Each edit destroys at most n n-grams, so a match must share at least
+    ``a + n - 1 - n * d_max`` n-grams with the query.
+    """
+
+    def __init__(self, values: Sequence[str], normalized: Sequence[str]):
+        self.values = values
+        self.lengths = tuple(len(key) for key in normalized)
+
+        postings = defaultdict(list)
+        for idx, key in enumerate(normalized):
+            if not key:
+                continue
+            for gram, count in ngrams(key).items():
+                postings[gram].append((idx, count))
+        self.postings = {gram: tuple(entries) for gram, entries in postings.items()}
+
+    def candidates(self, key: str, threshold: int) -> Optional[list[int]]:
+        """
+        Indexes of values that can score >= ``threshold`` against ``key``,
+        in vocabulary order, or None when the bound cannot prune anything.
+        """
+        if threshold < MIN_PRUNABLE_THRESHOLD:
+            return None
+
+        slack = (100.5 - threshold) / 100  # intr() rounds 97.5 up to 98
+        a = len(key)
+        max_len = int(a * (1 + slack) / (1 - slack))
+        min_len = a * (1 - slack) / (1 + slack)
+        max_distance = int((a + max_len) * slack)
+        required = a + NGRAM_SIZE - 1 - NGRAM_SIZE * max_distance
+        if required <= 0:
+            return None
+
+        shared = defaultdict(int)
+        for gram, q_count in ngrams(key).items():
+            for idx, count in self.postings.get(gram, ()):
+                shared[idx] += min(q_count, count)
+
+        return sorted(
+            idx
+            for idx, common in shared.items()
+            if common >= required and min_len <= self.lengths[idx] <= max_len
+        )
+
+    def extract_one(self, query: str, threshold: int):
+        """
+        Best (value, score) for ``query``, or None when nothing can reach
+        ``threshold``. Falls back to a full WRatio scan when pruning is not
+        exact for the given threshold.
+        """
+        # extractOne runs full_process on the query, then WRatio runs it
+        # again with force_ascii; mirror that so scores are identical.
+        processed = utils.full_process(query)
+        key = utils.full_process(processed, force_ascii=True)
+        if not key:
+            return None
+
+        candidate_ids = self.candidates(key, threshold)
+        if candidate_ids is None:
+            return process.extractOne(query, self.values, scorer=fuzz.WRatio)
+
+        best = None
+        for idx in candidate_ids:
+            score = fuzz.WRatio(processed, self.values[idx])
+            if score >= threshold and (best is None or score > best[1]):
+                best = (self.values[idx], score)
+        return best
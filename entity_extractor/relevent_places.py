@@ -1,14 +1,32 @@
+import asyncio
 import os
 import json
+from collections import Counter
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
+from pydantic import BaseModel
 from dotenv import load_dotenv
 from langchain_ollama import ChatOllama
+from ollama import AsyncClient
 from langchain_core.output_parsers.openai_tools import PydanticToolsParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from entity_extractor.fuzzy_wuzzy import fuzzy_match_address, get_non_empty_fields
+from entity_extractor.gazetteer import GAZETTEER_LEVELS, Gazetteer, gazetteer_registry
+from entity_extractor.house_numbers import (
+    HOUSE_NUMBER_FIELDS,
+    house_range_registry,
+    match_house_number,
+)
 from entity_extractor.model import Address
-from entity_extractor.search_field import SearchFeilds, search_qdrant_by_filter
+from entity_extractor.rule_parser import parse_address_rules
+from entity_extractor.search_field import (
+    SearchFeilds,
+    search_qdrant_by_filter,
+    search_qdrant_by_filters,
+)
+from app.concurrency import gather_bounded, raise_if_all_failed
+from app.services.ollama_pool import ollama_async_client_kwargs
 
 # -----------------------------
 # Load environment variables
@@ -19,6 +37,15 @@ load_dotenv()
 class Settings:
     model_name: str = os.getenv("CHAT_MODEL")
     ollama_url: str = os.getenv("OLLAMA_URL")
+    keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    search_concurrency: int = int(os.getenv("QDRANT_SEARCH_CONCURRENCY", "8"))
+    search_timeout: float = float(os.getenv("QDRANT_SEARCH_TIMEOUT", "10"))
+    # Fuzzy threshold inside a gazetteer subtree (global matching uses 98)
+    subtree_match_threshold: int = int(os.getenv("SUBTREE_MATCH_THRESHOLD", "85"))
+    # Rule-based parses at least this confident skip the LLM
+    rule_parser_min_confidence: float = float(
+        os.getenv("RULE_PARSER_MIN_CONFIDENCE", "0.7")
+    )
 
 
 def get_settings():
@@ -38,171 +65,30 @@ class AddressAnalyzer:
         self.model_name = model_name or self.settings.model_name
         self.ollama_url = ollama_url or self.settings.ollama_url
 
+        self.keep_alive = self.settings.keep_alive
+
         self.llm = ChatOllama(
-            model=self.model_name, base_url=self.ollama_url, timeout=300
+            model=self.model_name,
+            base_url=self.ollama_url,
+            timeout=300,
+            keep_alive=self.keep_alive,
+            async_client_kwargs=ollama_async_client_kwargs(),
         )
 
         self.llm_with_tools = self.llm.bind_tools([Address])
         self.output_parser = PydanticToolsParser(tools=[Address])
         self._prompt: Optional[ChatPromptTemplate] = None
+        # Composed once; reused by every parse_address call
+        self.chain = self._get_prompt() | self.llm_with_tools | self.output_parser
 
     # -----------------------------
-    # Create Prompt Template
-    # -----------------------------
-    def _get_prompt(self) -> ChatPromptTemplate:
-        if self._prompt is None:
-            system_prompt = """
-
-You are an expert address parser.
-
-IMPORTANT RULES:
-- The user may mention MULTIPLE ADDRESSES.
-- You MUST output ONE Address tool call per detected address.
-- DO NOT merge different people's addresses.
-- Return EACH FIELD as a LIST of strings, even if only one value exists.
-- Unknown or missing values must return an empty list [].
-- The output MUST strictly match the Address BaseModel:
-    house_low, house_high, locality, town, postcode, region
-
-Example:
-User: "I live at 10 King St, Wellington. My brother lives in Palmerston North."
-→ Output 2 separate Address tool calls (JSON array):
-
-[{{"house_low":["10"], "house_high":[], "locality":["King St"], "town":["Wellington"], "postcode":[], "region":[]}},
- {{"house_low":[], "house_high":[], "locality":[], "town":["Palmerston North"], "postcode":[], "region":[]}}]
-
-
-"""
-            self._prompt = ChatPromptTemplate.from_messages(
-                [("system", system_prompt), ("human", "{input}")]
-            )
-        return self._prompt
-
-    # -----------------------------
-    # Parse Address → supports multiple addresses
-    # -----------------------------
-    def parse_address(self, query: str) -> List[Address]:
-        prompt = self._get_prompt()
-        chain = prompt | self.llm_with_tools | self.output_parser
-        result = chain.invoke({"input": query})
-        print("Raw LLM output:", result)
-
-        addresses: List[Address] = []
-
-        # Handle string output (JSON)
-        if isinstance(result, str):
-            try:
-                parsed = json.loads(result)
-            except json.JSONDecodeError:
-                parsed = result
-
-            if isinstance(parsed, list):
-                for item in parsed:
-                    addresses.extend(self._split_combined_address(item))
-            elif isinstance(parsed, dict):
-                addresses.extend(self._split_combined_address(parsed))
-
-        # Handle dict output
-        elif isinstance(result, dict):
-            addresses.extend(self._split_combined_address(result))
-
-        # Handle Address object
-        elif isinstance(result, Address):
-            addresses.extend(self._split_combined_address(result.dict()))
-
-        # Handle list of mixed objects
-        elif isinstance(result, list):
-            for item in result:
-                if isinstance(item, Address):
-                    addresses.extend(self._split_combined_address(item.dict()))
-                elif isinstance(item, dict):
-                    addresses.extend(self._split_combined_address(item))
-
-        return addresses
-
-    # -----------------------------
-    # Normalize all values to List[str]
-    # -----------------------------
-    def _normalize_to_lists(self, raw: Dict[str, Any]) -> Dict[str, List[str]]:
-        normalized = {}
-        for key in Address.model_fields.keys():
-            val = raw.get(key, [])
-            if isinstance(val, str):
-                val = [val]
-            elif isinstance(val, list):
-                val = [str(v) for v in val]
-            else:
-                val = []
-            normalized[key] = val
-        return normalized
-
-    # -----------------------------
-    # Split combined Address fields into multiple Address objects
+    # Load the model ahead of the first query
     # -----------------------------
-    def _split_combined_address(self, raw: Dict[str, Any]) -> List[Address]:
-        normalized = self._normalize_to_lists(raw)
-        # Determine max number of addresses from the longest field
-        max_len = max(len(v) for v in normalized.values())
-        split_addresses = []
-
-        for i in range(max_len):
-            addr_dict = {}
-            for key, values in normalized.items():
-                addr_dict[key] = [values[i]] if i < len(values) else []
-            split_addresses.append(Address(**addr_dict))
-        return split_addresses
-
-
-# -----------------------------
-# Workflow
-import os
-import json
-from typing import Optional, Dict, Any, List
-from pydantic import BaseModel
-from dotenv import load_dotenv
-from langchain_ollama import ChatOllama
-from langchain_core.output_parsers.openai_tools import PydanticToolsParser
-from langchain_core.prompts import ChatPromptTemplate
-
-from entity_extractor.fuzzy_wuzzy import fuzzy_match_address, get_non_empty_fields
-from entity_extractor.model import Address
-from entity_extractor.search_field import SearchFeilds
-
-# -----------------------------
-# Load environment variables
-# -----------------------------
-load_dotenv()
-
-
-class Settings:
-    model_name: str = os.getenv("CHAT_MODEL")
-    ollama_url: str = os.getenv("OLLAMA_URL")
-
-
-def get_settings():
-    return Settings()
-
-
-# -----------------------------
-# Address Analyzer
-# -----------------------------
-class AddressAnalyzer:
-    """Analyze a user query and return structured address metadata."""
-
-    def __init__(
-        self, model_name: Optional[str] = None, ollama_url: Optional[str] = None
-    ):
-        self.settings = get_settings()
-        self.model_name = model_name or self.settings.model_name
-        self.ollama_url = ollama_url or self.settings.ollama_url
-
-        self.llm = ChatOllama(
-            model=self.model_name, base_url=self.ollama_url, timeout=300
-        )
-
-        self.llm_with_tools = self.llm.bind_tools([Address])
-        self.output_parser = PydanticToolsParser(tools=[Address])
-        self._prompt: Optional[ChatPromptTemplate] = None
+    async def warm_up(self):
+        # A generate call without a prompt only loads the model and pins it
+        # in memory for keep_alive
+        client = AsyncClient(host=self.ollama_url, **ollama_async_client_kwargs())
+        await client.generate(model=self.model_name, keep_alive=self.keep_alive)
 
     # -----------------------------
     # Create Prompt Template
@@ -236,10 +122,8 @@ User: "I live at 10 King St, Wellington. My brother lives in Palmerston North."
     # -----------------------------
     # Parse Address → supports multiple addresses
     # -----------------------------
-    def parse_address(self, query: str) -> List[Address]:
-        prompt = self._get_prompt()
-        chain = prompt | self.llm_with_tools | self.output_parser
-        result = chain.invoke({"input": query})
+    async def parse_address(self, query: str) -> List[Address]:
+        result = await self.chain.ainvoke({"input": query})
         print("Raw LLM output:", result)
 
         addresses: List[Address] = []
@@ -314,19 +198,90 @@ User: "I live at 10 King St, Wellington. My brother lives in Palmerston North."
         return split_addresses
 
 
+@lru_cache(maxsize=None)
+def get_address_analyzer() -> AddressAnalyzer:
+    """Long-lived analyzer shared by every request."""
+    return AddressAnalyzer()
+
+
 # -----------------------------
-# Workflow
+# Field matching
 # -----------------------------
+def match_fields(
+    non_empty_fields: Dict[str, List[str]],
+    candidates: Dict[str, Any],
+    gazetteer: Gazetteer,
+    subtree_threshold: int = 85,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fuzzy-match each field, broadest first. Once a field resolves, the
+    narrower ones are matched within its subtree of the gazetteer (tens of
+    candidates, so a looser threshold is safe), and only fall back to the
+    whole vocabulary when nothing there matches. Fields whose values never
+    occur together with the others are marked ``consistent: False``.
+    """
+    order = {level: i for i, level in enumerate(GAZETTEER_LEVELS)}
+    field_names = sorted(
+        (name for name in non_empty_fields if name in candidates),
+        key=lambda name: order.get(name, len(order)),
+    )
+
+    best_matches = {}
+    resolved = {}
+    for field_name in field_names:
+        values = non_empty_fields[field_name]
+        best_match = None
+        subtree = gazetteer.subtree(field_name, resolved)
+        if subtree:
+            best_match, score, original = fuzzy_match_address(
+                values, subtree, field_name, threshold=subtree_threshold
+            )
+        if best_match is None:
+            best_match, score, original = fuzzy_match_address(
+                values, candidates[field_name], field_name
+            )
+        best_matches[field_name] = {
+            "original": original,
+            "best_match": best_match,
+            "score": score,
+        }
+        if best_match is not None:
+            resolved[field_name] = best_match
+
+    conflicts = gazetteer.conflicts(resolved)
+    if conflicts:
+        print(f"Inconsistent address fields: {conflicts}")
+        # Blame the field(s) that disagree with the most others
+        counts = Counter(name for pair in conflicts for name in pair)
+        worst = max(counts.values())
+        for field_name, count in counts.items():
+            if count == worst:
+                best_matches[field_name]["consistent"] = False
+    return best_matches
 
 
 # -----------------------------
 # Workflow
 # -----------------------------
 async def run_workflow(user_query: str):
-    analyzer = AddressAnalyzer()
-
-    # Step 1: Parse Addresses
-    address_results = analyzer.parse_address(user_query)
+    settings = get_settings()
+
+    # Step 1: Parse Addresses (rules first, the LLM only when they are unsure)
+    # Off the event loop: the first parse after a vocabulary change rebuilds
+    # the place scanner
+    rule_parse = await asyncio.to_thread(parse_address_rules, user_query)
+    if rule_parse.confidence >= settings.rule_parser_min_confidence:
+        print(
+            f"Rule-based parse (confidence {rule_parse.confidence:.2f}), "
+            "skipping LLM"
+        )
+        address_results = rule_parse.addresses
+    else:
+        print(
+            f"Rule-based parse not confident ({rule_parse.confidence:.2f}: "
+            f"{rule_parse.notes}), using LLM"
+        )
+        address_results = await get_address_analyzer().parse_address(user_query)
     print("\n=== Parsed Addresses ===")
     for i, addr in enumerate(address_results):
         print(f"Address {i+1}: {addr}")
@@ -338,44 +293,90 @@ async def run_workflow(user_query: str):
         non_empty_fields = get_non_empty_fields(addr)
         print(non_empty_fields)
 
-        # Fetch candidate values for each field
-        qdrant_dummy_candidates = {}
-        for field_name, values in non_empty_fields.items():
-            y = await SearchFeilds(field_name)
-            qdrant_dummy_candidates[field_name] = y
-
-        qdrant_candidates_all.append(qdrant_dummy_candidates)
+        # Fetch candidate values for every field concurrently; house
+        # numbers are matched numerically instead
+        field_names = [
+            name for name in non_empty_fields if name not in HOUSE_NUMBER_FIELDS
+        ]
+        candidates = await gather_bounded(
+            (SearchFeilds(field_name) for field_name in field_names),
+            limit=settings.search_concurrency,
+        )
+        qdrant_candidates_all.append(dict(zip(field_names, candidates)))
 
     # Step 3: Fuzzy Matching per address
+    house_ranges = house_range_registry.get()
+    gazetteer = gazetteer_registry.get()
     merged_best_matches = {}
     for i, addr in enumerate(address_results):
-        best_matches = {}
         non_empty_fields = get_non_empty_fields(addr)
         qdrant_candidates = qdrant_candidates_all[i]
 
-        for field_name, values in non_empty_fields.items():
-            if field_name in qdrant_candidates:
-                best_match, score, original = fuzzy_match_address(
-                    values, qdrant_candidates[field_name], field_name
+        best_matches = match_fields(
+            non_empty_fields,
+            qdrant_candidates,
+            gazetteer,
+            settings.subtree_match_threshold,
+        )
+
+        # House numbers become a range filter, checked against the street.
+        # The parser puts street names in locality ("King St"): the first
+        # raw value with a known range is taken as the street
+        town = best_matches.get("town", {}).get("best_match")
+        street = next(
+            (
+                value
+                for value in non_empty_fields.get("locality", [])
+                if house_ranges.street_range(value, town) is not None
+            ),
+            None,
+        )
+        for field_name in HOUSE_NUMBER_FIELDS:
+            if field_name in non_empty_fields:
+                best_matches[field_name] = match_house_number(
+                    non_empty_fields[field_name], street, house_ranges, town
                 )
-                best_matches[field_name] = {
-                    "original": original,
-                    "best_match": best_match,
-                    "score": score,
-                }
 
         # Keep one entry per parsed address
         merged_best_matches[f"address_{i+1}"] = best_matches
 
     print(f"\n=== Merged Best Matches ===\n{merged_best_matches}")
 
-    # Step 4: Query Qdrant separately for each address
+    # Step 4: Query Qdrant for every address in one batched round trip
+    searches = {
+        addr_key: filter_dict
+        for addr_key, filter_dict in merged_best_matches.items()
+        if isinstance(filter_dict, dict)
+    }
+    try:
+        batched = await asyncio.wait_for(
+            search_qdrant_by_filters(searches, query=user_query),
+            settings.search_timeout,
+        )
+        responses = [batched[addr_key] for addr_key in searches]
+    except Exception as e:
+        # Fall back to concurrent single searches
+        print(f"Batched Qdrant search failed: {e!r}")
+        responses = raise_if_all_failed(
+            await gather_bounded(
+                (
+                    search_qdrant_by_filter(filter_dict, query=user_query)
+                    for filter_dict in searches.values()
+                ),
+                limit=settings.search_concurrency,
+                timeout=settings.search_timeout,
+                return_exceptions=True,
+            ),
+            "Qdrant filter searches",
+        )
+
     final_results = []
-    for addr_key, filter_dict in merged_best_matches.items():
-        if isinstance(filter_dict, dict):
-            res = await search_qdrant_by_filter(filter_dict, query=user_query)
-            if isinstance(res, list) and res:
-                final_results.append({"address_key": addr_key, "results": res})
+    for addr_key, res in zip(searches, responses):
+        if isinstance(res, BaseException):
+            print(f"Qdrant search failed for {addr_key}: {res!r}")
+            continue
+        if isinstance(res, list) and res:
+            final_results.append({"address_key": addr_key, "results": res})
 
     print("\n=== Final Qdrant Results ===")
 
@@ -0,0 +1,178 @@
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from entity_extractor.gazetteer import Gazetteer, gazetteer_registry
+from entity_extractor.model import Address
+from entity_extractor.vocabulary import VocabularyRegistry, vocabulary_registry
+from vector_db.place_scanner import get_place_scanner
+
+# Same shapes as the regexes in vector_db/address_extractor.py, with the
+# house number and an optional range captured. A unit ("2/14") is matched
+# but dropped: points carry no unit to filter on
+STREET_TYPES = (
+    r"Rd|Road|St|Street|Ave|Avenue|Lane|Ln|Drive|Dr|Pl|Place|Cres|Crescent"
+    r"|Tce|Terrace|Hwy|Highway|Pde|Parade|Way|Cl|Close|Ct|Court|Gr|Grove"
+    r"|Quay|Sq|Square|Blvd|Boulevard|Esp|Esplanade"
+)
+STREET_PATTERN = re.compile(
+    r"\b(?:\w+\s*/\s*)?(?P<low>\d+)[A-Za-z]?"
+    r"(?:\s*-\s*(?P<high>\d+)[A-Za-z]?)?\s+"
+    rf"(?P<street>[A-Za-z][A-Za-z'\- ]*?\s(?:{STREET_TYPES}))\b\.?",
+    re.IGNORECASE,
+)
+POSTCODE_PATTERN = re.compile(r"\b\d{4}\b")
+COUNTRY_PATTERN = re.compile(r"\b(NZ|New Zealand)\b", re.IGNORECASE)
+
+# Words that mean the text is a sentence about an address rather than an
+# address: those go to the LLM
+CONVERSATIONAL_WORDS = frozenset("""
+    i im i'm me my mine we our us you your he she his her him they their them
+    live lives living lived moved moving stay stays staying work works
+    please find where what which who how can could would should tell show
+    is are was were am hi hello thanks thank near
+    """.split())
+
+# Segments of one query that hold separate addresses
+_SEGMENT_SPLIT = re.compile(r"[;\n]+")
+_WORD = re.compile(r"[A-Za-z']+")
+
+
+@dataclass
+class RuleParse:
+    addresses: list[Address] = field(default_factory=list)
+    confidence: float = 0.0
+    # Why confidence is low, for logging
+    notes: list[str] = field(default_factory=list)
+
+
+def is_conversational(text: str) -> bool:
+    if "?" in text:
+        return True
+    words = {w.lower() for w in _WORD.findall(text)}
+    return bool(words & CONVERSATIONAL_WORDS)
+
+
+def _parse_segment(
+    segment: str,
+    registry: VocabularyRegistry,
+    gazetteer: Gazetteer,
+) -> tuple[Optional[Address], float, list[str]]:
+    notes = []
+    fields = {name: [] for name in Address.model_fields}
+    consumed = []
+    confidence = 0.0
+
+    # House number and street
+    street_match = STREET_PATTERN.search(segment)
+    if street_match:
+        fields["house_low"] = [street_match.group("low")]
+        fields["house_high"] = [street_match.group("high") or street_match.group("low")]
+        consumed.append(street_match.span())
+        confidence += 0.35
+    else:
+        notes.append("no street")
+
+    # Known places
+    scanner = get_place_scanner(registry)
+    mentions = scanner.scan(segment) if scanner is not None else []
+    mentions = [
+        m
+        for m in mentions
+        if not street_match
+        or m.end <= street_match.start()
+        or m.start >= street_match.end()
+    ]
+    town = next((m for m in reversed(mentions) if "town" in m.fields), None)
+    for mention in mentions:
+        consumed.append((mention.start, mention.end))
+        if mention is town:
+            fields["town"] = [mention.value_for("town")]
+        elif "locality" in mention.fields and not fields["locality"]:
+            fields["locality"] = [mention.value_for("locality")]
+        elif "region" in mention.fields and not fields["region"]:
+            fields["region"] = [mention.value_for("region")]
+        if mention.score < 100:
+            confidence -= 0.05
+            notes.append(f"typo in {mention.text!r}")
+    if town is not None:
+        confidence += 0.3
+    else:
+        notes.append("no town")
+    if fields["locality"]:
+        confidence += 0.1
+    elif street_match:
+        # Same convention as the LLM prompt: the street goes in locality
+        fields["locality"] = [street_match.group("street").strip()]
+
+    # Postcode, other than the house number
+    postcode_vocabulary = registry.get("postcode")
+    for match in POSTCODE_PATTERN.finditer(segment):
+        if street_match and street_match.start() <= match.start() < street_match.end():
+            continue
+        fields["postcode"] = [match.group()]
+        consumed.append(match.span())
+        if postcode_vocabulary is not None and match.group() in postcode_vocabulary:
+            confidence += 0.15
+        else:
+            notes.append("unknown postcode")
+        break
+
+    for match in COUNTRY_PATTERN.finditer(segment):
+        consumed.append(match.span())
+
+    # Anything left over is text the rules did not understand
+    leftover = list(segment)
+    for start, end in consumed:
+        leftover[start:end] = " " * (end - start)
+    unparsed = _WORD.findall("".join(leftover))
+    if unparsed:
+        confidence -= 0.1 * len(unparsed)
+        notes.append(f"unparsed {unparsed}")
+    else:
+        confidence += 0.1
+
+    resolved = {
+        name: values[0]
+        for name, values in fields.items()
+        if values and name in ("region", "town", "locality", "postcode")
+    }
+    conflicts = gazetteer.conflicts(resolved)
+    if conflicts:
+        # Enough that even an otherwise perfect parse (1.0) goes to the LLM
+        confidence -= 0.5
+        notes.append(f"inconsistent {conflicts}")
+
+    if not any(fields.values()):
+        return None, 0.0, notes
+    return Address(**fields), max(0.0, min(1.0, confidence)), notes
+
+
+def parse_address_rules(
+    text: str,
+    registry: VocabularyRegistry = vocabulary_registry,
+    gazetteer: Optional[Gazetteer] = None,
+) -> RuleParse:
+    """
+    Parse well-formed NZ addresses ("10 King St, Kelburn, Wellington 6012")
+    without the LLM. One Address per ``;``/newline separated segment; the
+    confidence is that of the weakest segment, and 0 for conversational text.
+    """
+    if is_conversational(text):
+        return RuleParse(notes=["conversational"])
+    gazetteer = gazetteer if gazetteer is not None else gazetteer_registry.get()
+
+    result = RuleParse(confidence=1.0)
+    for segment in _SEGMENT_SPLIT.split(text):
+        if not segment.strip():
+            continue
+        address, confidence, notes = _parse_segment(segment, registry, gazetteer)
+        result.notes.extend(notes)
+        if address is None:
+            return RuleParse(notes=result.notes + ["nothing recognised"])
+        result.addresses.append(address)
+        result.confidence = min(result.confidence, confidence)
+
+    if not result.addresses:
+        result.confidence = 0.0
+    return result
@@ -1,12 +1,23 @@
 # qdrant_search_post.py
+import asyncio
 import json
 import os
 from dotenv import load_dotenv
-from qdrant_client import AsyncQdrantClient
 from langchain_ollama import OllamaEmbeddings
-from qdrant_client.models import Filter, FieldCondition, MatchText, MatchValue
-
-from entity_extractor.cache_field import save_field_to_single_json
+from app.services.embedding_batcher import get_embedding_batcher
+from app.services.embedding_cache import embedding_cache
+from app.services.qdrant_pool import get_async_qdrant_client, server_timeout
+from app.config import settings
+from qdrant_client.models import Filter
+
+from entity_extractor.cache_field import update_vocabulary_store
+from entity_extractor.filter_planner import FilterVariant, plan_filter
+from entity_extractor.vocabulary import vocabulary_registry
+from entity_extractor.vocabulary_builder import (
+    build_vocabularies,
+    vocabulary_fields_for,
+)
+from entity_extractor.vocabulary_refresher import VocabularyRefresher
 
 
 # -------------------
@@ -15,15 +26,26 @@ from entity_extractor.cache_field import save_field_to_single_json
 load_dotenv()
 
 OLLAMA_URL = os.getenv("OLLAMA_URL")
-QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_COLLECTION = os.getenv("COLLECTION_NAME")
+VOCAB_PAGE_SIZE = int(os.getenv("VOCAB_PAGE_SIZE", "1000"))
+VOCAB_SCROLL_WORKERS = int(os.getenv("VOCAB_SCROLL_WORKERS", "4"))
+VOCAB_REFRESH_INTERVAL = float(os.getenv("VOCAB_REFRESH_INTERVAL", "300"))
 
 # -------------------
 # Initialize clients
 # -------------------
-client = AsyncQdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=60)
-embedder = OllamaEmbeddings(base_url=OLLAMA_URL, model="nomic-embed-text:latest")
+client = get_async_qdrant_client()
+EMBEDDING_MODEL = "nomic-embed-text:latest"
+embedder = OllamaEmbeddings(base_url=OLLAMA_URL, model=EMBEDDING_MODEL)
+embedding_batcher = get_embedding_batcher(OLLAMA_URL, EMBEDDING_MODEL)
+vocabulary_refresher = VocabularyRefresher(
+    client,
+    QDRANT_COLLECTION,
+    interval=VOCAB_REFRESH_INTERVAL,
+    page_size=VOCAB_PAGE_SIZE,
+    workers=VOCAB_SCROLL_WORKERS,
+    timeout=settings.qdrant_scroll_timeout,
+)
 
 
 # -------------------
@@ -47,31 +69,17 @@ async def count_points_with_filter(filter_condition: Filter):
 
 async def get_unique_towns(feild_name: str):
     """
-    Scroll through the collection to extract all unique town names.
+    Scroll through the collection to extract all unique values of a field.
     """
-    unique_towns = set()
-    offset = None
-    limit = 100  # Adjust limit for efficient pagination
-
-    while True:
-        scroll_result, next_page_offset = await client.scroll(
-            collection_name=QDRANT_COLLECTION,
-            limit=limit,
-            offset=offset,
-            with_payload=True,
-            with_vectors=False,
-        )
-
-        for point in scroll_result:
-            town_name = point.payload.get(feild_name)
-            if town_name:
-                unique_towns.add(town_name)
-
-        if not next_page_offset:
-            break
-        offset = next_page_offset
-
-    return list(unique_towns)
+    vocabularies, _ = await build_vocabularies(
+        client,
+        QDRANT_COLLECTION,
+        fields=[feild_name],
+        page_size=VOCAB_PAGE_SIZE,
+        workers=VOCAB_SCROLL_WORKERS,
+        timeout=settings.qdrant_scroll_timeout,
+    )
+    return list(vocabularies[feild_name])
 
 
 # -------------------
@@ -79,63 +87,131 @@ async def get_unique_towns(feild_name: str):
 # -------------------
 
 
-def load_fields_json(json_file="fields.json"):
-    """Load existing JSON file or return empty dict."""
-    if os.path.exists(json_file):
-        with open(json_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+# Only one cold-cache scan at a time; waiters reuse its result
+_vocabulary_build_lock = asyncio.Lock()
 
 
 async def SearchFeilds(feild_name: str):
-    json_file = "fields.json"
-    existing_fields = load_fields_json(json_file)
-    if feild_name in existing_fields:
-        return existing_fields[feild_name]
-    my_filter = Filter(
-        must_not=[FieldCondition(key=feild_name, match=MatchValue(value=""))]
-    )
-    total_matching = await count_points_with_filter(my_filter)
-    print(f"Total points with non-empty {feild_name}: {total_matching}")
-    towns = await get_unique_towns(feild_name)
-    save_field_to_single_json(feild_name, towns, json_file=json_file)
-    print(f"Unique {feild_name}: {towns}")
-    return towns
+    # Served from the in-memory registry; fields.json is only read once
+    vocabulary = vocabulary_registry.get(feild_name)
+    if vocabulary is not None:
+        return vocabulary
+
+    async with _vocabulary_build_lock:
+        vocabulary = vocabulary_registry.get(feild_name)
+        if vocabulary is not None:
+            return vocabulary
+
+        # One scan fills every configured field, not just the one asked for
+        vocabularies, stats = await build_vocabularies(
+            client,
+            QDRANT_COLLECTION,
+            fields=vocabulary_fields_for(feild_name),
+            page_size=VOCAB_PAGE_SIZE,
+            workers=VOCAB_SCROLL_WORKERS,
+            timeout=settings.qdrant_scroll_timeout,
+        )
+        print(f"Built vocabularies in one scan: {stats}")
+        # Waits on a cross-process file lock: keep it off the event loop
+        await asyncio.to_thread(
+            update_vocabulary_store, vocabularies, vocabulary_registry.store_file
+        )
+        vocabulary_registry.set_fields(vocabularies)
+
+    return vocabulary_registry.get(feild_name)
 
 
 def get_embedding(text: str):
-    """Get embedding vector for the query text."""
-    return embedder.embed_query(text)
+    """Get embedding vector for the query text (cached across call sites)."""
+    return embedding_cache.get_or_compute(EMBEDDING_MODEL, text, embedder.embed_query)
+
+
+async def aget_embedding(text: str):
+    """Non-blocking get_embedding; concurrent calls are batched together."""
+    return await embedding_batcher.embed(text)
+
+
+from qdrant_client.models import QueryRequest
+
 
+def build_filter(filter_dict: dict):
+    """Build Qdrant Filter, using best_match and skipping None/empty"""
+    return plan_filter(filter_dict)[0].filter
 
-from qdrant_client.models import Filter, FieldCondition, MatchText
+
+def clean_points(points):
+    return [{"id": p.id, "score": p.score, "payload": p.payload} for p in points]
+
+
+def _variant_requests(query_vector, variants: list[FilterVariant], limit: int):
+    return [
+        QueryRequest(
+            query=query_vector,
+            filter=variant.filter,
+            limit=limit,
+            with_payload=True,
+            with_vector=False,
+        )
+        for variant in variants
+    ]
+
+
+def _tightest_result(variants: list[FilterVariant], responses) -> list:
+    """Points of the first (most constrained) variant that matched anything."""
+    for variant, response in zip(variants, responses):
+        if response.points:
+            if variant.dropped:
+                print(f"Relaxed filter, dropped {variant.dropped}")
+            return clean_points(response.points)
+    return []
 
 
 async def search_qdrant_by_filter(filter_dict: dict, query: str, limit: int = 1):
     print(filter_dict)
-    query_vector = get_embedding(query)
-    # Build Qdrant Filter, using best_match and skipping None/empty
-    must_conditions = []
-    for key, val in filter_dict.items():
-        # Ensure val is a dict and best_match is not empty
-        if isinstance(val, dict) and val.get("best_match"):
-            must_conditions.append(
-                FieldCondition(key=key, match=MatchText(text=val["best_match"]))
-            )
-    my_filter = Filter(must=must_conditions) if must_conditions else None
-    # Perform the search
-    search_result = await client.query_points(
+    query_vector = await aget_embedding(query)
+    # Every relaxation of the filter goes out in the same round trip
+    variants = plan_filter(filter_dict)
+    responses = await client.query_batch_points(
         collection_name=QDRANT_COLLECTION,
-        query=query_vector,
-        limit=limit,
-        query_filter=my_filter,
-        with_payload=True,
-        with_vectors=False,
+        requests=_variant_requests(query_vector, variants, limit),
+        timeout=server_timeout(settings.qdrant_search_timeout),
     )
-    # search_result is a list of ScoredPoint
-    points = search_result.points
-    clean_results = [
-        {"id": p.id, "score": p.score, "payload": p.payload} for p in points
-    ]
+    clean_results = _tightest_result(variants, responses)
     print(clean_results)
     return clean_results
+
+
+async def search_qdrant_by_filters(
+    filter_dicts: dict[str, dict], query: str, limit: int = 1
+) -> dict[str, list]:
+    """
+    Filtered search for several parsed addresses, with every relaxed variant
+    of every filter, in one query_batch_points round trip. Returns the
+    tightest non-empty result per address, keyed like ``filter_dicts``.
+    """
+    if not filter_dicts:
+        return {}
+    query_vector = await aget_embedding(query)
+    plans = {
+        addr_key: plan_filter(filter_dict)
+        for addr_key, filter_dict in filter_dicts.items()
+    }
+    requests = [
+        request
+        for variants in plans.values()
+        for request in _variant_requests(query_vector, variants, limit)
+    ]
+    responses = await client.query_batch_points(
+        collection_name=QDRANT_COLLECTION,
+        requests=requests,
+        timeout=server_timeout(settings.qdrant_search_timeout),
+    )
+
+    results = {}
+    position = 0
+    for addr_key, variants in plans.items():
+        batch = responses[position : position + len(variants)]
+        position += len(variants)
+        results[addr_key] = _tightest_result(variants, batch)
+    print(results)
+    return results
@@ -0,0 +1,255 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections.abc import Sequence
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+
+from fuzzywuzzy import utils
+
+from entity_extractor.cache_field import ValueCounts, read_vocabulary_store
+from entity_extractor.ngram_index import NgramIndex
+
+
+def load_fields_json(json_file="fields.json"):
+    """Load existing JSON file or return empty dict."""
+    if os.path.exists(json_file):
+        with open(json_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def load_fields(store_file="fields.vocab", json_file="fields.json"):
+    """
+    Load the vocabulary store, or the legacy fields.json while no store has
+    been written yet. Never writes: the store is created by the first
+    vocabulary build or refresh.
+    """
+    if os.path.exists(store_file):
+        return read_vocabulary_store(store_file)
+    return load_fields_json(json_file)
+
+
+def normalize_value(value: str) -> str:
+    """Normalize a value the same way fuzz.WRatio does before scoring."""
+    return utils.full_process(value, force_ascii=True)
+
+
+# Long and short spellings that should compare equal; everything is folded
+# to the short form (so "St" and "Street" meet in the middle)
+CANONICAL_ABBREVIATIONS = {
+    "street": "st",
+    "saint": "st",
+    "road": "rd",
+    "avenue": "ave",
+    "av": "ave",
+    "drive": "dr",
+    "lane": "ln",
+    "place": "pl",
+    "crescent": "cres",
+    "terrace": "tce",
+    "highway": "hwy",
+    "parade": "pde",
+    "mount": "mt",
+    "point": "pt",
+    "north": "n",
+    "nth": "n",
+    "south": "s",
+    "sth": "s",
+    "east": "e",
+    "west": "w",
+    "central": "ctrl",
+}
+
+
+def canonical_key(value: str) -> str:
+    """
+    Key that ignores case, punctuation, macrons, spacing and common
+    abbreviations, e.g. "Whangārei" == "WHANGAREI" and
+    "Green meadows" == "Greenmeadows".
+    """
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    text = re.sub(r"['\u2019`]", "", text.casefold())
+    tokens = re.findall(r"[0-9a-z]+", text)
+    return "".join(CANONICAL_ABBREVIATIONS.get(t, t) for t in tokens)
+
+
+# -------------------
+# Field vocabulary
+# -------------------
+class FieldVocabulary(Sequence):
+    """
+    Immutable, pre-normalized set of distinct values for one payload field.
+
+    Behaves like the plain candidate list returned by SearchFeilds before
+    (indexable, iterable, sized) so it can be passed straight to the fuzzy
+    matcher, and adds O(1) membership, normalized and canonical-key lookups.
+    """
+
+    __slots__ = (
+        "field_name",
+        "_values",
+        "_normalized",
+        "_members",
+        "_lookup",
+        "_canonical",
+        "_counts",
+        "_point_count",
+        "_ngram_index",
+    )
+
+    def __init__(self, field_name: str, values: Iterable):
+        self.field_name = field_name
+        # A mapping carries point counts per value (see build_vocabularies)
+        counts = None
+        points = values.points if isinstance(values, ValueCounts) else None
+        if isinstance(values, Mapping):
+            counts = {str(v): int(n) for v, n in values.items() if v}
+            values = counts.keys()
+        # Drop empties and duplicates while keeping the original order
+        self._values = tuple(dict.fromkeys(str(v) for v in values if v))
+        self._counts = MappingProxyType(counts) if counts is not None else None
+        if points is None and counts is not None:
+            # Over-counts points holding a list; only for stores without points
+            points = sum(counts.values())
+        self._point_count = points
+        self._normalized = tuple(normalize_value(v) for v in self._values)
+        self._members = frozenset(self._values)
+
+        lookup = {}
+        canonical = {}
+        for value, key in zip(self._values, self._normalized):
+            lookup.setdefault(key, value)
+            canonical.setdefault(canonical_key(value), value)
+        canonical.pop("", None)
+        self._lookup = MappingProxyType(lookup)
+        self._canonical = MappingProxyType(canonical)
+        self._ngram_index: Optional[NgramIndex] = None
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __contains__(self, value) -> bool:
+        return value in self._members
+
+    def __repr__(self):
+        return f"FieldVocabulary(field='{self.field_name}', size={len(self)})"
+
+    @property
+    def values(self) -> tuple:
+        return self._values
+
+    @property
+    def normalized(self) -> tuple:
+        """Normalized form of each value, aligned with ``values``."""
+        return self._normalized
+
+    def lookup(self, value: str) -> Optional[str]:
+        """Return the vocabulary value whose normalized form equals ``value``'s."""
+        return self._lookup.get(normalize_value(value))
+
+    def frequency(self, value: str) -> Optional[int]:
+        """Number of points holding ``value``, or None when counts are unknown."""
+        if self._counts is None:
+            return None
+        return self._counts.get(value, 0)
+
+    @property
+    def point_count(self) -> Optional[int]:
+        """Number of points with a non-empty value, when counts are known."""
+        return self._point_count
+
+    def canonical_lookup(self, value: str) -> Optional[str]:
+        """Return the vocabulary value sharing ``value``'s canonical key."""
+        return self._canonical.get(canonical_key(value))
+
+    @property
+    def ngram_index(self) -> NgramIndex:
+        """N-gram index for candidate pruning, built on first use."""
+        if self._ngram_index is None:
+            self._ngram_index = NgramIndex(self._values, self._normalized)
+        return self._ngram_index
+
+
+# -------------------
+# Process-wide registry
+# -------------------
+class VocabularyRegistry:
+    """
+    Loads every cached field vocabulary once and keeps it in memory.
+
+    The published mapping is never mutated: updates build a new mapping and
+    swap the reference, so readers never need the lock.
+    """
+
+    def __init__(
+        self, store_file: str = "fields.vocab", json_file: str = "fields.json"
+    ):
+        self.store_file = store_file
+        self.json_file = json_file
+        self._lock = threading.Lock()
+        self._vocabularies: Optional[Mapping[str, FieldVocabulary]] = None
+
+    def _ensure_loaded(self) -> Mapping[str, FieldVocabulary]:
+        vocabularies = self._vocabularies
+        if vocabularies is None:
+            with self._lock:
+                if self._vocabularies is None:
+                    self._vocabularies = self._load()
+                vocabularies = self._vocabularies
+        return vocabularies
+
+    def _load(self) -> Mapping[str, FieldVocabulary]:
+        raw = load_fields(self.store_file, self.json_file)
+        return MappingProxyType(
+            {name: FieldVocabulary(name, values) for name, values in raw.items()}
+        )
+
+    def get(self, field_name: str) -> Optional[FieldVocabulary]:
+        return self._ensure_loaded().get(field_name)
+
+    def __contains__(self, field_name: str) -> bool:
+        return field_name in self._ensure_loaded()
+
+    def fields(self) -> list[str]:
+        return list(self._ensure_loaded().keys())
+
+    def publish(self, vocabularies: Mapping[str, FieldVocabulary]) -> None:
+        """
+        Atomically swap in already-built vocabularies. Requests holding the
+        previous FieldVocabulary objects keep using them undisturbed.
+        """
+        with self._lock:
+            current = dict(self._vocabularies or self._load())
+            current.update(vocabularies)
+            self._vocabularies = MappingProxyType(current)
+
+    def set_field(self, field_name: str, values: Iterable) -> FieldVocabulary:
+        """Publish a new vocabulary for ``field_name`` and return it."""
+        vocabulary = FieldVocabulary(field_name, values)
+        self.publish({field_name: vocabulary})
+        return vocabulary
+
+    def set_fields(self, fields: Mapping[str, Iterable]) -> None:
+        """Publish several vocabularies in one swap."""
+        self.publish(
+            {name: FieldVocabulary(name, values) for name, values in fields.items()}
+        )
+
+    def reload(self) -> None:
+        """Re-read the vocabulary store, replacing every vocabulary."""
+        vocabularies = self._load()
+        with self._lock:
+            self._vocabularies = vocabularies
+
+
+vocabulary_registry = VocabularyRegistry()
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence, TypeVar
+
+from qdrant_client import AsyncQdrantClient
+
+from entity_extractor.cache_field import ValueCounts
+
+logger = logging.getLogger(__name__)
+
+S = TypeVar("S")
+
+# Payload fields the fuzzy matcher needs a vocabulary for. House numbers are
+# not fuzzy matched; see house_numbers.py
+VOCABULARY_FIELDS = ("locality", "town", "postcode", "region")
+
+
+@dataclass
+class VocabularyBuildStats:
+    points_scanned: int = 0
+    pages: int = 0
+    workers: int = 0
+    elapsed: float = 0.0
+    worker_elapsed: list[float] = field(default_factory=list)
+
+    def __repr__(self):
+        rate = self.points_scanned / self.elapsed if self.elapsed else 0.0
+        return (
+            f"VocabularyBuildStats(points={self.points_scanned}, pages={self.pages}, "
+            f"workers={self.workers}, elapsed={self.elapsed:.2f}s, rate={rate:.0f}/s)"
+        )
+
+
+def _id_key(point_id):
+    """Sort key matching Qdrant's id order: integer ids first, then UUIDs."""
+    if isinstance(point_id, int):
+        return (0, point_id)
+    return (1, uuid.UUID(str(point_id)).int)
+
+
+async def _id_boundaries(
+    client: AsyncQdrantClient, collection_name: str, workers: int
+) -> list:
+    """
+    Split the id space into ``workers`` disjoint ranges, returned as start ids.
+
+    Ranges only need to be disjoint and cover everything: the last worker is
+    unbounded, so a poor split costs balance, never correctness.
+    """
+    first, _ = await client.scroll(
+        collection_name=collection_name,
+        limit=1,
+        with_payload=False,
+        with_vectors=False,
+    )
+    if not first:
+        return []
+
+    first_id = first[0].id
+    if workers <= 1:
+        return [first_id]
+
+    if isinstance(first_id, int):
+        # Assume roughly dense integer ids
+        estimate = await client.count(collection_name=collection_name, exact=False)
+        span = max(1, math.ceil(estimate.count / workers))
+        return [first_id + i * span for i in range(workers)]
+
+    start = uuid.UUID(str(first_id)).int
+    step = max(1, ((1 << 128) - start) // workers)
+    return [str(uuid.UUID(int=start + i * step)) for i in range(workers)]
+
+
+async def scan_collection(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    fields: Sequence[str],
+    new_state: Callable[[], S],
+    visit: Callable[[S, dict], None],
+    page_size: int = 1000,
+    workers: int = 4,
+    progress_every: int = 20,
+    timeout: Optional[int] = None,
+) -> tuple[list[S], VocabularyBuildStats]:
+    """
+    Feed the payload (``fields`` only) of every point to ``visit``.
+
+    ``workers`` scrolls run concurrently over disjoint id ranges, each with
+    its own state from ``new_state``; the per-worker states are returned
+    for the caller to merge. ``timeout`` applies per page.
+    """
+    fields = list(fields)
+    stats = VocabularyBuildStats()
+    started = time.perf_counter()
+
+    boundaries = await _id_boundaries(client, collection_name, workers)
+    stats.workers = len(boundaries)
+    stats.worker_elapsed = [0.0] * len(boundaries)
+
+    async def scan_range(worker: int, start, end) -> S:
+        state = new_state()
+        worker_started = time.perf_counter()
+        end_key = _id_key(end) if end is not None else None
+        offset = start
+
+        while offset is not None:
+            points, offset = await client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=fields,
+                with_vectors=False,
+                timeout=timeout,
+            )
+
+            for point in points:
+                if end_key is not None and _id_key(point.id) >= end_key:
+                    offset = None
+                    break
+                visit(state, point.payload or {})
+                stats.points_scanned += 1
+
+            if offset is not None and end_key is not None:
+                if _id_key(offset) >= end_key:
+                    offset = None
+
+            stats.pages += 1
+            if stats.pages % progress_every == 0:
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"Collection scan: {stats.points_scanned} points, "
+                    f"{stats.pages} pages, {elapsed:.1f}s"
+                )
+
+        stats.worker_elapsed[worker] = time.perf_counter() - worker_started
+        return state
+
+    ranges = [
+        (i, start, boundaries[i + 1] if i + 1 < len(boundaries) else None)
+        for i, start in enumerate(boundaries)
+    ]
+    states = await asyncio.gather(*(scan_range(*r) for r in ranges))
+    stats.elapsed = time.perf_counter() - started
+    return list(states), stats
+
+
+async def build_vocabularies(
+    client: AsyncQdrantClient,
+    collection_name: str,
+    fields: Sequence[str] = VOCABULARY_FIELDS,
+    page_size: int = 1000,
+    workers: int = 4,
+    progress_every: int = 20,
+    timeout: Optional[int] = None,
+) -> tuple[dict[str, ValueCounts], VocabularyBuildStats]:
+    """
+    Collect the distinct values (with point counts) of every field in
+    ``fields``, and how many points have each field, in a single scan of
+    the collection.
+
+    Only the requested payload keys are fetched, and ``workers`` scrolls run
+    concurrently over disjoint id ranges. ``timeout`` applies per page.
+    """
+    fields = list(fields)
+
+    def count_values(counters: dict[str, ValueCounts], payload: dict):
+        for name in fields:
+            value = payload.get(name)
+            values = value if isinstance(value, list) else [value]
+            found = False
+            for v in values:
+                if v not in (None, ""):
+                    counters[name][str(v)] += 1
+                    found = True
+            # Counted like the refresher's non-empty count filter
+            if found:
+                counters[name].points += 1
+
+    partials, stats = await scan_collection(
+        client,
+        collection_name,
+        fields,
+        new_state=lambda: {name: ValueCounts(points=0) for name in fields},
+        visit=count_values,
+        page_size=page_size,
+        workers=workers,
+        progress_every=progress_every,
+        timeout=timeout,
+    )
+
+    vocabularies = {name: ValueCounts(points=0) for name in fields}
+    for partial in partials:
+        for name, counter in partial.items():
+            vocabularies[name].update(counter)
+            vocabularies[name].points += counter.points
+
+    logger.info(
+        f"Built vocabularies for {fields} from '{collection_name}': {stats} "
+        + ", ".join(f"{name}={len(values)}" for name, values in vocabularies.items())
+    )
+    return vocabularies, stats
+
+
+def vocabulary_fields_for(field_name: Optional[str] = None) -> list[str]:
+    """Configured fields, plus ``field_name`` if it is not one of them."""
+    fields = list(VOCABULARY_FIELDS)
+    if field_name and field_name not in fields:
+        fields.append(field_name)
+    return fields
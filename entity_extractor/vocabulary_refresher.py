@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    IsEmptyCondition,
+    MatchValue,
+    PayloadField,
+)
+
+from entity_extractor.cache_field import StoreBackedRegistry, update_vocabulary_store
+from entity_extractor.gazetteer import (
+    GAZETTEER_LEVELS,
+    build_gazetteer,
+    gazetteer_registry,
+    save_gazetteer,
+)
+from entity_extractor.house_numbers import (
+    build_house_ranges,
+    house_range_registry,
+    save_house_ranges,
+)
+from entity_extractor.vocabulary import (
+    FieldVocabulary,
+    VocabularyRegistry,
+    vocabulary_registry,
+)
+from entity_extractor.vocabulary_builder import VOCABULARY_FIELDS, build_vocabularies
+from vector_db.place_scanner import get_place_scanner
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CollectionSnapshot:
+    points_count: Optional[int]
+    indexed_vectors_count: Optional[int]
+    segments_count: Optional[int]
+
+
+class VocabularyRefresher:
+    """
+    Keeps the vocabulary registry in step with the collection in the
+    background.
+
+    Every ``interval`` seconds it compares cheap collection stats with the
+    last run. When they move, it counts the non-empty points of each field
+    and rebuilds only the fields whose count no longer matches the published
+    vocabulary. It does that in one scan, then swaps the new vocabularies in
+    atomically. Edits that keep every count unchanged are picked up by the
+    full rebuild every ``full_refresh_every`` cycles. The per-street house
+    number ranges and the gazetteer are kept fresh the same way.
+    """
+
+    def __init__(
+        self,
+        client: AsyncQdrantClient,
+        collection_name: str,
+        registry: VocabularyRegistry = vocabulary_registry,
+        fields: Sequence[str] = VOCABULARY_FIELDS,
+        house_ranges: Optional[StoreBackedRegistry] = house_range_registry,
+        gazetteer: Optional[StoreBackedRegistry] = gazetteer_registry,
+        interval: float = 300.0,
+        full_refresh_every: int = 12,
+        page_size: int = 1000,
+        workers: int = 4,
+        timeout: Optional[int] = None,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.registry = registry
+        self.fields = list(fields)
+        self.house_ranges = house_ranges
+        self.gazetteer = gazetteer
+        self.interval = interval
+        self.full_refresh_every = full_refresh_every
+        self.page_size = page_size
+        self.workers = workers
+        self.timeout = timeout
+
+        self._snapshot: Optional[CollectionSnapshot] = None
+        self._cycles = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _take_snapshot(self) -> CollectionSnapshot:
+        info = await self.client.get_collection(self.collection_name)
+        return CollectionSnapshot(
+            points_count=info.points_count,
+            indexed_vectors_count=info.indexed_vectors_count,
+            segments_count=info.segments_count,
+        )
+
+    async def _field_point_count(self, field_name: str) -> int:
+        non_empty = Filter(
+            must_not=[
+                IsEmptyCondition(is_empty=PayloadField(key=field_name)),
+                FieldCondition(key=field_name, match=MatchValue(value="")),
+            ]
+        )
+        result = await self.client.count(
+            collection_name=self.collection_name, count_filter=non_empty, exact=True
+        )
+        return result.count
+
+    async def _stale_fields(self) -> list[str]:
+        counts = await asyncio.gather(
+            *(self._field_point_count(name) for name in self.fields)
+        )
+        stale = []
+        for name, count in zip(self.fields, counts):
+            vocabulary = self.registry.get(name)
+            # Vocabularies loaded without counts can't be compared: rebuild
+            if vocabulary is None or vocabulary.point_count != count:
+                stale.append(name)
+        return stale
+
+    async def _house_ranges_stale(self, stale_fields: list[str]) -> bool:
+        count = await self._field_point_count("house_low")
+        return self.house_ranges.get().point_count != count
+
+    async def _gazetteer_stale(self, stale_fields: list[str]) -> bool:
+        if set(stale_fields) & set(GAZETTEER_LEVELS):
+            return True
+        result = await self.client.count(
+            collection_name=self.collection_name, exact=True
+        )
+        return self.gazetteer.get().point_count != result.count
+
+    async def _refresh_vocabularies(self, stale: list[str]):
+        started = time.perf_counter()
+        vocabularies, stats = await build_vocabularies(
+            self.client,
+            self.collection_name,
+            fields=stale,
+            page_size=self.page_size,
+            workers=self.workers,
+            timeout=self.timeout,
+        )
+
+        # Build (and warm the n-gram index of) the new vocabularies off the
+        # event loop, then publish them in a single reference swap
+        def prepare():
+            built = {}
+            for name, counts in vocabularies.items():
+                built[name] = FieldVocabulary(name, counts)
+                built[name].ngram_index
+            return built
+
+        built = await asyncio.to_thread(prepare)
+        self.registry.publish(built)
+        # Rebuild the place scanner here rather than in the next request
+        await asyncio.to_thread(get_place_scanner, self.registry)
+        await asyncio.to_thread(
+            update_vocabulary_store, vocabularies, self.registry.store_file
+        )
+
+        logger.info(
+            f"Refreshed vocabularies {stale} in {time.perf_counter() - started:.2f}s "
+            f"({stats})"
+        )
+
+    async def _refresh_index(
+        self, name: str, registry: StoreBackedRegistry, build, save
+    ):
+        started = time.perf_counter()
+        index = await build(
+            self.client,
+            self.collection_name,
+            page_size=self.page_size,
+            workers=self.workers,
+            timeout=self.timeout,
+        )
+        registry.publish(index)
+        await asyncio.to_thread(save, index, registry.store_file)
+        logger.info(f"Refreshed {name} in {time.perf_counter() - started:.2f}s")
+
+    async def refresh_once(self, force: bool = False) -> list[str]:
+        """
+        Rebuild whatever changed; returns the refreshed field names, plus
+        "house_ranges" / "gazetteer" when those were rebuilt.
+        """
+        self._cycles += 1
+        snapshot = await self._take_snapshot()
+        full = force or (
+            self.full_refresh_every and self._cycles % self.full_refresh_every == 0
+        )
+
+        if not full and snapshot == self._snapshot:
+            return []
+
+        stale = list(self.fields) if full else await self._stale_fields()
+        self._snapshot = snapshot
+
+        refreshed = []
+        if stale:
+            await self._refresh_vocabularies(stale)
+            refreshed.extend(stale)
+
+        derived = (
+            (
+                "house_ranges",
+                self.house_ranges,
+                self._house_ranges_stale,
+                build_house_ranges,
+                save_house_ranges,
+            ),
+            (
+                "gazetteer",
+                self.gazetteer,
+                self._gazetteer_stale,
+                build_gazetteer,
+                save_gazetteer,
+            ),
+        )
+        for name, registry, is_stale, build, save in derived:
+            if registry is not None and (full or await is_stale(stale)):
+                await self._refresh_index(name, registry, build, save)
+                refreshed.append(name)
+        return refreshed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Vocabulary refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the refresh loop on the running event loop (idempotent)."""
+        if self.interval <= 0 or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,8 +1,10 @@
 # app/services/rag_service.py
+import asyncio
 import logging
 from langchain_core.prompts import PromptTemplate
 from langchain_ollama import ChatOllama
 from app.config import settings
+from app.services.ollama_pool import ollama_async_client_kwargs
 from app.database import ConversationHistory, SessionLocal
 from typing import Optional
 from datetime import datetime
@@ -14,6 +16,8 @@ llm = ChatOllama(
     model=settings.chat_model,
     base_url=settings.ollama_host.rstrip("/"),
     temperature=0.0,
+    keep_alive=settings.ollama_keep_alive,
+    async_client_kwargs=ollama_async_client_kwargs(),
 )
 
 # Prompt template with placeholders
@@ -133,7 +137,7 @@ def is_greeting_or_general(query: str) -> bool:
     return any(greeting in query_lower for greeting in greetings)
 
 
-def rag_address_query(
+async def rag_address_query(
     partial_address: str, user_query: str, session_id: Optional[str] = None
 ) -> str:
     """
@@ -151,7 +155,7 @@ def rag_address_query(
     if is_greeting_or_general(user_query) or not partial_address:
         # Retrieve conversation history for context
         history_context = (
-            get_conversation_history(session_id, limit=5)
+            await asyncio.to_thread(get_conversation_history, session_id, 5)
             if session_id
             else "No previous conversation."
         )
@@ -159,20 +163,22 @@ def rag_address_query(
         prompt_text = greeting_template.format(
             user_query=user_query, conversation_history=history_context
         )
-        response = llm.invoke(prompt_text)
+        response = await llm.ainvoke(prompt_text)
         if hasattr(response, "content"):
             response_text = response.content
         else:
             response_text = str(response)
 
         if session_id:
-            save_to_history(session_id, user_query, response_text, score="N/A")
+            await asyncio.to_thread(
+                save_to_history, session_id, user_query, response_text, "N/A"
+            )
 
         return response_text
 
     # Retrieve conversation history if session_id provided
     history_context = (
-        get_conversation_history(session_id, limit=5)
+        await asyncio.to_thread(get_conversation_history, session_id, 5)
         if session_id
         else "No previous conversation."
     )
@@ -187,7 +193,7 @@ def rag_address_query(
     )
 
     # Generate LLM response
-    response = llm.invoke(prompt_text)
+    response = await llm.ainvoke(prompt_text)
     if hasattr(response, "content"):
         response_text = response.content
     else:
@@ -196,6 +202,8 @@ def rag_address_query(
     # Save response to conversation history
     print(response_text)
     if session_id:
-        save_to_history(session_id, user_query, response_text, score="0")
+        await asyncio.to_thread(
+            save_to_history, session_id, user_query, response_text, "0"
+        )
 
     return response_text
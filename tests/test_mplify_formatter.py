@@ -0,0 +1,161 @@
+# tests/test_mplify_formatter.py
+import pytest
+
+from app.services.mplify_formatter import format_payload, split_number, split_street
+
+
+@pytest.mark.parametrize(
+    "street, expected",
+    [
+        ("Queen St", {"street_name": "Queen", "street_type": "Street"}),
+        (
+            "N Queen St East",
+            {
+                "street_pre_direction": "North",
+                "street_name": "Queen",
+                "street_type": "Street",
+                "street_post_direction": "East",
+            },
+        ),
+        # A leading "North" is part of the name
+        ("North Road", {"street_name": "North", "street_type": "Road"}),
+        ("WEST COAST RD", {"street_name": "West Coast", "street_type": "Road"}),
+        # A type or direction alone is the name
+        ("Esplanade", {"street_name": "Esplanade"}),
+        ("Broadway", {"street_name": "Broadway"}),
+        ("", {}),
+    ],
+)
+def test_split_street(street, expected):
+    assert split_street(street) == expected
+
+
+@pytest.mark.parametrize(
+    "address, fields, sub_units, street",
+    [
+        ("14 Queen Street", {"street_number": "14"}, [], "Queen Street"),
+        (
+            "14A-16 Queen Street, Auckland",
+            {
+                "street_number": "14",
+                "street_number_suffix": "A",
+                "street_number_last": "16",
+            },
+            [],
+            "Queen Street",
+        ),
+        (
+            "2/14 Queen Street",
+            {"street_number": "14"},
+            [{"sub_unit_type": "UNIT", "sub_unit_name": "2"}],
+            "Queen Street",
+        ),
+        (
+            "Flat 2, 14 Queen Street",
+            {"street_number": "14"},
+            [{"sub_unit_type": "FLAT", "sub_unit_name": "2"}],
+            "Queen Street",
+        ),
+        (
+            "Unit 3 Level 2, 5 Main Rd",
+            {"street_number": "5"},
+            [
+                {"sub_unit_type": "UNIT", "sub_unit_name": "3"},
+                {"sub_unit_type": "LEVEL", "sub_unit_name": "2"},
+            ],
+            "Main Rd",
+        ),
+        ("Unitec Road", {}, [], ""),
+        ("", {}, [], ""),
+    ],
+)
+def test_split_number(address, fields, sub_units, street):
+    assert split_number(address) == (fields, sub_units, street)
+
+
+@pytest.mark.parametrize(
+    "payload, expected, missing",
+    [
+        (
+            {
+                "normalized_address": "10 KING STREET, KELBURN, WELLINGTON",
+                "street_name": "KING STREET",
+                "locality": "KELBURN",
+                "town": "WELLINGTON",
+                "postcode": 6012,
+                "region": "WELLINGTON REGION",
+            },
+            {
+                "street_number": "10",
+                "street_name": "King",
+                "street_type": "Street",
+                "locality": "Kelburn",
+                "city": "Wellington",
+                "postal_code": "6012",
+                "state_or_province": "Wellington Region",
+                "country": "NZ",
+                "language": "EN",
+                "sub_units": [],
+            },
+            [],
+        ),
+        # Number from the house range, postcode with its leading zero back
+        (
+            {
+                "normalized_address": "MAIN ROAD, KAITAIA",
+                "street_name": "MAIN ROAD",
+                "town": "KAITAIA",
+                "postcode": 410,
+                "house_low": 20,
+                "house_high": 24,
+            },
+            {
+                "street_number": "20",
+                "street_number_last": "24",
+                "street_name": "Main",
+                "street_type": "Road",
+                "city": "Kaitaia",
+                "postal_code": "0410",
+                "country": "NZ",
+                "language": "EN",
+                "sub_units": [],
+            },
+            [],
+        ),
+        (
+            {"normalized_address": "PO Box 123, Wellington", "town": "WELLINGTON"},
+            {
+                "po_box_number": "123",
+                "city": "Wellington",
+                "country": "NZ",
+                "language": "EN",
+                "sub_units": [],
+            },
+            [],
+        ),
+        (
+            {"normalized_address": "Unit 3 Level 2, 5 Main Rd"},
+            {
+                "street_number": "5",
+                "street_name": "Main",
+                "street_type": "Road",
+                "country": "NZ",
+                "language": "EN",
+                "sub_units": [
+                    {"sub_unit_type": "UNIT", "sub_unit_name": "3"},
+                    {"sub_unit_type": "LEVEL", "sub_unit_name": "2"},
+                ],
+            },
+            ["city"],
+        ),
+        (
+            {},
+            {"country": "NZ", "language": "EN", "sub_units": []},
+            ["street_number", "street_name", "city"],
+        ),
+    ],
+)
+def test_format_payload(payload, expected, missing):
+    ordered, actual_missing = format_payload(payload)
+    assert ordered == expected
+    assert actual_missing == missing
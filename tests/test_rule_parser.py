@@ -0,0 +1,113 @@
+# tests/test_rule_parser.py
+import pytest
+
+from entity_extractor.gazetteer import Gazetteer
+from entity_extractor.rule_parser import parse_address_rules
+from entity_extractor.vocabulary import VocabularyRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = VocabularyRegistry(
+        store_file=str(tmp_path / "fields.vocab"),
+        json_file=str(tmp_path / "fields.json"),
+    )
+    registry.set_fields(
+        {
+            "region": ["WELLINGTON REGION", "AUCKLAND REGION"],
+            "town": ["WELLINGTON", "AUCKLAND", "HAMILTON"],
+            "locality": ["KELBURN", "PONSONBY"],
+            "postcode": ["6012", "1011"],
+        }
+    )
+    return registry
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer(
+        {
+            ("WELLINGTON REGION", "WELLINGTON", "KELBURN", "6012"): 10,
+            ("AUCKLAND REGION", "AUCKLAND", "PONSONBY", "1011"): 10,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "10 King St, Kelburn, Wellington 6012",
+            [
+                {
+                    "house_low": ["10"],
+                    "house_high": ["10"],
+                    "locality": ["KELBURN"],
+                    "town": ["WELLINGTON"],
+                    "postcode": ["6012"],
+                    "region": [],
+                }
+            ],
+        ),
+        # A range, and a unit that is dropped; the street stands in for the
+        # unknown locality
+        (
+            "2/10-14 Queen Street, Auckland",
+            [
+                {
+                    "house_low": ["10"],
+                    "house_high": ["14"],
+                    "locality": ["Queen Street"],
+                    "town": ["AUCKLAND"],
+                    "postcode": [],
+                    "region": [],
+                }
+            ],
+        ),
+        (
+            "10 King St, Wellington; 5 Ponsonby Rd, Ponsonby, Auckland",
+            [
+                {
+                    "house_low": ["10"],
+                    "house_high": ["10"],
+                    "locality": ["King St"],
+                    "town": ["WELLINGTON"],
+                    "postcode": [],
+                    "region": [],
+                },
+                {
+                    "house_low": ["5"],
+                    "house_high": ["5"],
+                    "locality": ["PONSONBY"],
+                    "town": ["AUCKLAND"],
+                    "postcode": [],
+                    "region": [],
+                },
+            ],
+        ),
+    ],
+)
+def test_parse_address_rules(text, expected, registry, gazetteer):
+    parse = parse_address_rules(text, registry, gazetteer)
+    assert [address.model_dump() for address in parse.addresses] == expected
+    assert parse.confidence > 0
+
+
+@pytest.mark.parametrize(
+    "text, at_least, below",
+    [
+        # Complete and consistent: skips the LLM at the default 0.7
+        ("10 King St, Kelburn, Wellington 6012", 0.7, None),
+        # Kelburn is not in Auckland
+        ("10 King St, Kelburn, Auckland 6012", None, 0.7),
+        ("10 King St, somewhere near the harbour", None, 0.7),
+        ("Where does my friend live in Wellington?", None, 0.01),
+        ("Hi, I live at 10 King St Wellington", None, 0.01),
+    ],
+)
+def test_parse_address_rules_confidence(text, at_least, below, registry, gazetteer):
+    confidence = parse_address_rules(text, registry, gazetteer).confidence
+    if at_least is not None:
+        assert confidence >= at_least
+    if below is not None:
+        assert confidence < below
@@ -1,9 +1,14 @@
-import spacy
 import re
+from typing import Iterable, Optional
 
-from vector_db.entity_extractor import extract_address_components_with_fuzzy
+from spacy.tokens import Doc
 
-nlp = spacy.load("en_core_web_sm")
+from vector_db.entity_extractor import (
+    display_place,
+    extract_address_components_with_fuzzy,
+)
+from vector_db.nlp import parse, parse_many
+from vector_db.place_scanner import get_place_scanner
 
 
 def normalize_component(part):
@@ -14,8 +19,8 @@ def normalize_component(part):
 
 
 # Function to extract lines that may contain addresses
-def extract_addresses_linewise(text: str):
-    doc = nlp(text)
+def extract_addresses_linewise(text: str, doc: Optional[Doc] = None):
+    doc = doc if doc is not None else parse(text, ner=False)
     sentences = [sent.text.strip() for sent in doc.sents]
 
     addresses = []
@@ -49,27 +54,50 @@ def extract_address_parts(line, parts):
 from fuzzywuzzy import fuzz
 
 
-def extract_address_parts_fuzzy(line, parts, threshold=80):
+def extract_address_parts_fuzzy(line, parts, threshold=80, place_parts=()):
+    """
+    Parts of ``parts`` that occur in ``line``. Known places are looked up
+    with the place scanner; only the rest are fuzzy-compared to the line.
+    """
+    scanner = get_place_scanner() if place_parts else None
+    line_places = set()
+    if scanner is not None:
+        line_places = {display_place(m.value) for m in scanner.scan(line)}
+
     matched = []
     for part in parts:
-        if fuzz.partial_ratio(part.lower(), line.lower()) >= threshold:
+        if scanner is not None and part in place_parts:
+            if part in line_places:
+                matched.append(part)
+        elif fuzz.partial_ratio(part.lower(), line.lower()) >= threshold:
             matched.append(part)
     return matched
 
 
-def run_workflow(text: str):
+def run_workflow(text: str, doc: Optional[Doc] = None):
+    # Parse once; both extractors read the same Doc. Entities are only read
+    # when there is no place scanner
+    doc = doc if doc is not None else parse(text, ner=get_place_scanner() is None)
+
     # Step 1: Extract all components
-    address_components = extract_address_components_with_fuzzy(text)
+    address_components = extract_address_components_with_fuzzy(text, doc=doc)
     address_parts = sum(address_components.values(), [])
     address_parts = [normalize_component(p) for p in address_parts]
+    place_parts = set(
+        address_components["localities"]
+        + address_components["towns"]
+        + address_components["regions"]
+    )
 
     # Step 2: Split text into address lines
-    address_lines = extract_addresses_linewise(text)
+    address_lines = extract_addresses_linewise(text, doc=doc)
 
     # Step 3: Extract parts from each line using fuzzy match
     extracted_addresses = []
     for line in address_lines:
-        parts_in_line = extract_address_parts_fuzzy(line, address_parts)
+        parts_in_line = extract_address_parts_fuzzy(
+            line, address_parts, place_parts=place_parts
+        )
         if parts_in_line:
             extracted_addresses.append(", ".join(parts_in_line))
 
@@ -79,3 +107,12 @@ def run_workflow(text: str):
         print(f"Address {i}: {addr}")
         addresses.append(addr)
     return addresses
+
+
+def run_workflow_batch(texts: Iterable[str], batch_size: int = 64):
+    """run_workflow over many texts, parsed together with nlp.pipe."""
+    texts = list(texts)
+    docs = parse_many(
+        texts, ner=get_place_scanner() is None, batch_size=batch_size
+    )
+    return [run_workflow(text, doc=doc) for text, doc in zip(texts, docs)]
@@ -1,8 +1,17 @@
-import spacy
 import re
+import string
 from difflib import get_close_matches
+from typing import Optional
 
-nlp = spacy.load("en_core_web_sm")
+from spacy.tokens import Doc
+
+from vector_db.nlp import parse
+from vector_db.place_scanner import get_place_scanner
+
+
+def display_place(value):
+    """Vocabulary values are upper case; "HAWKE'S BAY" -> "Hawke's Bay"."""
+    return string.capwords(value.lower())
 
 def normalize_text(s):
     return s.strip().upper().replace(".", "").replace(",", "")
@@ -20,21 +29,33 @@ def fuzzy_merge(items, cutoff=0.8):
             merged.append(item)
     return merged
 
-def extract_address_components_with_fuzzy(text: str):
-    doc = nlp(text)
-
+def extract_address_components_with_fuzzy(text: str, doc: Optional[Doc] = None):
     streets = set()
     localities = set()
     towns = set()
+    regions = set()
     countries = set()
     postcodes = set()
 
-    # --- 1. Extract location entities via SpaCy ---
-    location_labels = {"GPE", "LOC", "FAC", "ORG"}
+    # --- 1. Find known places with the gazetteer scanner ---
+    scanner = get_place_scanner()
     detected_locations = []
-    for ent in doc.ents:
-        if ent.label_ in location_labels:
-            detected_locations.append(ent.text.strip())
+    if scanner is not None:
+        for mention in scanner.scan(text):
+            if "town" in mention.fields:
+                towns.add(display_place(mention.value_for("town")))
+            elif "locality" in mention.fields:
+                localities.add(display_place(mention.value_for("locality")))
+            else:
+                regions.add(display_place(mention.value_for("region")))
+    else:
+        # No vocabularies yet: fall back to SpaCy location entities
+        if doc is None or not doc.has_annotation("ENT_IOB"):
+            doc = parse(text)
+        location_labels = {"GPE", "LOC", "FAC", "ORG"}
+        for ent in doc.ents:
+            if ent.label_ in location_labels:
+                detected_locations.append(ent.text.strip())
 
     # --- 2. Extract street addresses using regex ---
     street_pattern = r'\d+\s+[A-Za-z0-9\s]+(?:Rd|Road|St|Street|Ave|Avenue|Lane|Ln|Drive|Dr)\b'
@@ -66,6 +87,7 @@ def extract_address_components_with_fuzzy(text: str):
     streets = fuzzy_merge(streets)
     localities = fuzzy_merge(localities)
     towns = fuzzy_merge(towns)
+    regions = fuzzy_merge(regions)
     countries = fuzzy_merge(countries)
     postcodes = fuzzy_merge(postcodes)
 
@@ -73,6 +95,7 @@ def extract_address_components_with_fuzzy(text: str):
         "streets": sorted(streets),
         "localities": sorted(localities),
         "towns": sorted(towns),
+        "regions": sorted(regions),
         "countries": sorted(countries),
         "postcodes": sorted(postcodes)
     }
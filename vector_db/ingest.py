@@ -0,0 +1,413 @@
+# vector_db/ingest.py
+"""
+Bulk-load an address dump (CSV or Parquet) into the Qdrant collection.
+
+    python -m vector_db.ingest addresses.csv --workers 8 --build-vocabularies
+
+Rows are streamed, embedded in batches and upserted by several concurrent
+workers. Progress is checkpointed after every contiguous run of finished
+batches, so an interrupted run picks up where it stopped.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from dotenv import load_dotenv
+from langchain_ollama import OllamaEmbeddings
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Distance,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    PointStruct,
+    TextIndexParams,
+    TextIndexType,
+    TokenizerType,
+    VectorParams,
+)
+
+from app.services.ollama_pool import ollama_async_client_kwargs
+from app.services.qdrant_pool import get_async_qdrant_client
+from entity_extractor.cache_field import update_vocabulary_store
+from entity_extractor.filter_planner import (
+    FULL_TEXT_INDEX_FIELDS,
+    KEYWORD_INDEX_FIELDS,
+)
+from entity_extractor.gazetteer import (
+    build_gazetteer,
+    gazetteer_registry,
+    save_gazetteer,
+)
+from entity_extractor.house_numbers import (
+    HOUSE_NUMBER_FIELDS,
+    build_house_ranges,
+    house_range_registry,
+    parse_house_number,
+    save_house_ranges,
+)
+from entity_extractor.vocabulary import vocabulary_registry
+from entity_extractor.vocabulary_builder import VOCABULARY_FIELDS, build_vocabularies
+
+# -------------------
+# Load environment variables
+# -------------------
+load_dotenv()
+
+OLLAMA_URL = os.getenv("OLLAMA_URL")
+QDRANT_COLLECTION = os.getenv("COLLECTION_NAME", "new-zealand")
+# Must match the model the search path embeds queries with
+EMBEDDING_MODEL = "nomic-embed-text:latest"
+# Restored after a run when the collection's own threshold is unknown (an
+# interrupted run left it at 0 without a checkpoint); Qdrant's default
+DEFAULT_INDEXING_THRESHOLD = int(os.getenv("QDRANT_INDEXING_THRESHOLD", "20000"))
+
+# Payload fields stored on every point
+TEXT_FIELDS = (
+    "normalized_address",
+    "address_type",
+    "street_name",
+    "locality",
+    "town",
+    "postcode",
+    "region",
+    "tlc",
+)
+
+# Indexes the query path filters on: MatchText needs a full-text index,
+# exact matches a keyword index, house number ranges an integer index
+INTEGER_INDEX_FIELDS = HOUSE_NUMBER_FIELDS
+
+
+# -------------------
+# Readers
+# -------------------
+def iter_csv_rows(path: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+
+def iter_parquet_rows(path: str, batch_size: int = 10000) -> Iterator[dict]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Reading Parquet files requires pyarrow") from e
+
+    parquet_file = pq.ParquetFile(path)
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from record_batch.to_pylist()
+
+
+def iter_rows(path: str) -> Iterator[dict]:
+    if path.lower().endswith((".parquet", ".pq")):
+        return iter_parquet_rows(path)
+    return iter_csv_rows(path)
+
+
+def iter_batches(
+    rows: Iterable[dict], batch_size: int, skip: int = 0
+) -> Iterator[tuple[int, list[dict]]]:
+    """(row number of the first row, rows) batches, after skipping ``skip``."""
+    rows = iter(rows)
+    if skip:
+        next(islice(rows, skip, skip), None)
+    start = skip
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield start, batch
+        start += len(batch)
+
+
+# -------------------
+# Points
+# -------------------
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def row_payload(row: dict) -> dict:
+    payload = {name: _clean(row.get(name)) for name in TEXT_FIELDS}
+    for name in HOUSE_NUMBER_FIELDS:
+        payload[name] = parse_house_number(_clean(row.get(name)))
+    if payload["house_high"] is None:
+        payload["house_high"] = payload["house_low"]
+    return payload
+
+
+def embedding_text(payload: dict) -> str:
+    if payload.get("normalized_address"):
+        return payload["normalized_address"]
+    parts = [
+        payload.get("house_low"),
+        payload.get("street_name"),
+        payload.get("locality"),
+        payload.get("town"),
+        payload.get("postcode"),
+    ]
+    return " ".join(str(p) for p in parts if p not in (None, ""))
+
+
+def point_id(row: dict, row_number: int) -> int:
+    """The dump's own integer id if it has one, else the row number."""
+    raw = _clean(row.get("id"))
+    if raw is not None and raw.isdigit():
+        return int(raw)
+    return row_number
+
+
+# -------------------
+# Checkpoints
+# -------------------
+def load_checkpoint(path: str, source: str) -> dict:
+    """``rows_done`` and the collection's original ``indexing_threshold``."""
+    if not os.path.exists(path):
+        return {"rows_done": 0, "indexing_threshold": None}
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != os.path.abspath(source):
+        raise ValueError(
+            f"Checkpoint {path} belongs to {checkpoint.get('source')}, not {source}"
+        )
+    return {
+        "rows_done": int(checkpoint.get("rows_done", 0)),
+        "indexing_threshold": checkpoint.get("indexing_threshold"),
+    }
+
+
+def save_checkpoint(
+    path: str, source: str, rows_done: int, indexing_threshold: Optional[int]
+):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "source": os.path.abspath(source),
+                "rows_done": rows_done,
+                "indexing_threshold": indexing_threshold,
+            },
+            f,
+        )
+    os.replace(tmp_path, path)
+
+
+# -------------------
+# Collection setup
+# -------------------
+async def ensure_collection(
+    client: AsyncQdrantClient, collection_name: str, vector_size: int, recreate=False
+):
+    if recreate and await client.collection_exists(collection_name):
+        await client.delete_collection(collection_name)
+
+    if not await client.collection_exists(collection_name):
+        await client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+        )
+        print(f"Created collection '{collection_name}' (dim={vector_size})")
+
+    await create_payload_indexes(client, collection_name)
+
+
+async def create_payload_indexes(client: AsyncQdrantClient, collection_name: str):
+    """Create the payload indexes filtered search relies on (idempotent)."""
+    schemas = {
+        **{
+            name: TextIndexParams(
+                type=TextIndexType.TEXT,
+                tokenizer=TokenizerType.WORD,
+                lowercase=True,
+            )
+            for name in FULL_TEXT_INDEX_FIELDS
+        },
+        **{name: PayloadSchemaType.KEYWORD for name in KEYWORD_INDEX_FIELDS},
+        **{name: PayloadSchemaType.INTEGER for name in INTEGER_INDEX_FIELDS},
+    }
+    for name, schema in schemas.items():
+        await client.create_payload_index(
+            collection_name=collection_name,
+            field_name=name,
+            field_schema=schema,
+            wait=True,
+        )
+    print(f"Payload indexes ready: {', '.join(schemas)}")
+
+
+async def _indexing_threshold(client: AsyncQdrantClient, collection_name: str):
+    info = await client.get_collection(collection_name)
+    return info.config.optimizer_config.indexing_threshold
+
+
+async def _set_indexing_threshold(
+    client: AsyncQdrantClient, collection_name: str, threshold: Optional[int]
+):
+    await client.update_collection(
+        collection_name=collection_name,
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold),
+    )
+
+
+# -------------------
+# Ingestion
+# -------------------
+async def ingest(
+    path: str,
+    collection_name: str = QDRANT_COLLECTION,
+    batch_size: int = 256,
+    workers: int = 4,
+    checkpoint_path: Optional[str] = None,
+    recreate: bool = False,
+    build_vocabulary: bool = False,
+    model: str = EMBEDDING_MODEL,
+    ollama_url: Optional[str] = OLLAMA_URL,
+):
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+    if recreate and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = load_checkpoint(checkpoint_path, path)
+    rows_done = checkpoint["rows_done"]
+    if rows_done:
+        print(f"Resuming {path} after row {rows_done}")
+
+    client = get_async_qdrant_client()
+    embedder = OllamaEmbeddings(
+        base_url=ollama_url,
+        model=model,
+        async_client_kwargs=ollama_async_client_kwargs(),
+    )
+
+    vector_size = len(await embedder.aembed_query("address"))
+    await ensure_collection(client, collection_name, vector_size, recreate=recreate)
+
+    # Build the HNSW graph once at the end instead of while points stream in.
+    # The original threshold is checkpointed before it is changed: a killed
+    # run leaves the collection at 0, which must not be restored
+    indexing_threshold = checkpoint["indexing_threshold"]
+    if indexing_threshold is None:
+        indexing_threshold = await _indexing_threshold(client, collection_name)
+        if not indexing_threshold:
+            indexing_threshold = DEFAULT_INDEXING_THRESHOLD
+        save_checkpoint(checkpoint_path, path, rows_done, indexing_threshold)
+    await _set_indexing_threshold(client, collection_name, 0)
+
+    semaphore = asyncio.Semaphore(max(1, workers))
+    finished: dict[int, int] = {}
+    tasks: set[asyncio.Task] = set()
+    watermark = rows_done
+    started = time.perf_counter()
+
+    async def load_batch(start: int, rows: list[dict]) -> tuple[int, int]:
+        try:
+            payloads = [row_payload(row) for row in rows]
+            vectors = await embedder.aembed_documents(
+                [embedding_text(payload) for payload in payloads]
+            )
+            points = [
+                PointStruct(id=point_id(row, start + i), vector=vector, payload=payload)
+                for i, (row, payload, vector) in enumerate(zip(rows, payloads, vectors))
+            ]
+            await client.upsert(
+                collection_name=collection_name, points=points, wait=True
+            )
+            return start, start + len(rows)
+        finally:
+            semaphore.release()
+
+    def collect(done: Iterable[asyncio.Task]):
+        # Only checkpoint past batches with no unfinished batch before them
+        nonlocal watermark
+        for task in done:
+            tasks.discard(task)
+            start, end = task.result()
+            finished[start] = end
+        advanced = False
+        while watermark in finished:
+            watermark = finished.pop(watermark)
+            advanced = True
+        if advanced:
+            save_checkpoint(checkpoint_path, path, watermark, indexing_threshold)
+            rate = (watermark - rows_done) / (time.perf_counter() - started)
+            print(f"Ingested {watermark} rows ({rate:.0f} rows/s)")
+
+    try:
+        for start, rows in iter_batches(iter_rows(path), batch_size, skip=rows_done):
+            await semaphore.acquire()
+            tasks.add(asyncio.create_task(load_batch(start, rows)))
+            collect([task for task in tasks if task.done()])
+        if tasks:
+            done, _ = await asyncio.wait(tasks)
+            collect(done)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    finally:
+        await _set_indexing_threshold(client, collection_name, indexing_threshold)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Ingested {watermark - rows_done} rows into '{collection_name}' in {elapsed:.1f}s"
+    )
+
+    if build_vocabulary:
+        vocabularies, stats = await build_vocabularies(
+            client, collection_name, fields=VOCABULARY_FIELDS
+        )
+        update_vocabulary_store(vocabularies, vocabulary_registry.store_file)
+        print(f"Rebuilt vocabularies: {stats}")
+        ranges = await build_house_ranges(client, collection_name)
+        save_house_ranges(ranges, house_range_registry.store_file)
+        print(f"Rebuilt house number ranges for {len(ranges)} streets")
+        gazetteer = await build_gazetteer(client, collection_name)
+        save_gazetteer(gazetteer, gazetteer_registry.store_file)
+        print(f"Rebuilt gazetteer with {len(gazetteer)} combinations")
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="CSV or Parquet address dump")
+    parser.add_argument("--collection", default=QDRANT_COLLECTION)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", help="defaults to <path>.checkpoint.json")
+    parser.add_argument(
+        "--recreate",
+        action="store_true",
+        help="drop the collection and checkpoint and start over",
+    )
+    parser.add_argument(
+        "--build-vocabularies",
+        action="store_true",
+        help="rebuild the vocabulary, house number range and gazetteer stores afterwards",
+    )
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--ollama-url", default=OLLAMA_URL)
+    args = parser.parse_args(argv)
+
+    asyncio.run(
+        ingest(
+            args.path,
+            collection_name=args.collection,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            checkpoint_path=args.checkpoint,
+            recreate=args.recreate,
+            build_vocabulary=args.build_vocabularies,
+            model=args.model,
+            ollama_url=args.ollama_url,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# vector_db/migrate_house_numbers.py
+"""
+Convert string house_low/house_high payloads to integers in place.
+
+    python -m vector_db.migrate_house_numbers
+
+House number filters are integer ranges (see entity_extractor/filter_planner.py),
+which never match points whose house numbers are stored as strings, as in
+collections loaded before vector_db.ingest stored integers. Only points with
+a string value are rewritten, so the command can be rerun safely.
+"""
+
+import argparse
+import asyncio
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import SetPayload, SetPayloadOperation
+
+from app.services.qdrant_pool import get_async_qdrant_client
+from entity_extractor.house_numbers import HOUSE_NUMBER_FIELDS, parse_house_number
+from vector_db.ingest import create_payload_indexes
+
+load_dotenv()
+
+QDRANT_COLLECTION = os.getenv("COLLECTION_NAME", "new-zealand")
+
+
+def integer_house_numbers(payload: dict) -> Optional[dict]:
+    """Integer house number payload for a point, or None if nothing changes."""
+    values = {name: payload.get(name) for name in HOUSE_NUMBER_FIELDS}
+    if not any(isinstance(value, str) for value in values.values()):
+        return None
+    low = parse_house_number(values["house_low"])
+    high = parse_house_number(values["house_high"])
+    if high is None:
+        high = low
+    return {"house_low": low, "house_high": high}
+
+
+async def migrate(
+    client: AsyncQdrantClient, collection_name: str, page_size: int = 1000
+) -> int:
+    converted = seen = 0
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=list(HOUSE_NUMBER_FIELDS),
+            with_vectors=False,
+        )
+        seen += len(points)
+        operations = []
+        for point in points:
+            payload = integer_house_numbers(point.payload or {})
+            if payload is not None:
+                operations.append(
+                    SetPayloadOperation(
+                        set_payload=SetPayload(payload=payload, points=[point.id])
+                    )
+                )
+        if operations:
+            await client.batch_update_points(
+                collection_name=collection_name,
+                update_operations=operations,
+                wait=True,
+            )
+            converted += len(operations)
+        print(f"{seen} points scanned, {converted} converted")
+        if offset is None:
+            break
+
+    await create_payload_indexes(client, collection_name)
+    return converted
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collection", default=QDRANT_COLLECTION)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    asyncio.run(
+        migrate(get_async_qdrant_client(), args.collection, page_size=args.page_size)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# vector_db/nlp.py
+import os
+import threading
+from typing import Iterable, Iterator, Optional
+
+import spacy
+from dotenv import load_dotenv
+from spacy.language import Language
+from spacy.tokens import Doc
+
+load_dotenv()
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# The extractors only read sentences and entities
+UNUSED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+# Only needed when the place scanner is unavailable
+NER_COMPONENTS = ["ner"]
+
+_lock = threading.Lock()
+_nlp: Optional[Language] = None
+
+
+def get_nlp() -> Language:
+    """
+    The process-wide spaCy pipeline, loaded on first use without the
+    components nothing here reads. Sentences come from the lightweight
+    ``senter`` (or a rule-based sentencizer) instead of the parser.
+    """
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                nlp = spacy.load(SPACY_MODEL, exclude=UNUSED_COMPONENTS)
+                if "senter" in nlp.disabled:
+                    nlp.enable_pipe("senter")
+                elif not nlp.has_pipe("senter"):
+                    nlp.add_pipe("sentencizer", first=True)
+                _nlp = nlp
+    return _nlp
+
+
+def parse(text: str, ner: bool = True) -> Doc:
+    """
+    ``get_nlp()(text)``, skipping NER unless asked for. Components are
+    disabled per call, so threads sharing the pipeline don't interfere.
+    """
+    return get_nlp()(text, disable=[] if ner else NER_COMPONENTS)
+
+
+def parse_many(
+    texts: Iterable[str], ner: bool = True, batch_size: int = 64
+) -> Iterator[Doc]:
+    """``parse`` over many texts with ``nlp.pipe``."""
+    return get_nlp().pipe(
+        texts, batch_size=batch_size, disable=[] if ner else NER_COMPONENTS
+    )
@@ -0,0 +1,284 @@
+# vector_db/place_scanner.py
+"""
+Finds known place names (towns, localities, regions) in free text.
+
+Place names are compiled into a token-level Aho-Corasick automaton, so one
+pass over the text finds every mention, however many names there are. A
+second pass catches single-typo spellings through a deletion-neighbourhood
+index over the same names.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from Levenshtein import distance
+
+from entity_extractor.vocabulary import (
+    CANONICAL_ABBREVIATIONS,
+    VocabularyRegistry,
+    vocabulary_registry,
+)
+
+# Vocabulary fields scanned for, broadest first
+PLACE_FIELDS = ("region", "town", "locality")
+
+# Shorter keys give too many false positives in the typo pass
+MIN_TYPO_LENGTH = 5
+# Single-token names shorter than this are never matched
+MIN_TOKEN_LENGTH = 3
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+@dataclass(frozen=True)
+class PlaceMention:
+    start: int  # character offsets into the scanned text
+    end: int
+    text: str
+    value: str  # vocabulary value, preferring one spelled as in the text
+    fields: tuple[str, ...]
+    score: int  # 100 for exact mentions
+    # The vocabulary value in each of ``fields``: "Wellington" is the town
+    # WELLINGTON and the region WELLINGTON REGION
+    values: tuple[str, ...] = ()
+
+    def value_for(self, field_name: str) -> str:
+        if field_name in self.fields and self.values:
+            return self.values[self.fields.index(field_name)]
+        return self.value
+
+
+def tokenize(text: str) -> list[tuple[str, int, int]]:
+    """
+    (token, start, end) for every word of ``text``, folded like
+    ``canonical_key``: no case, macrons, apostrophes or long abbreviations.
+    """
+    tokens = []
+    for match in re.finditer(r"[^\W_]+(?:['’`][^\W_]+)*", text):
+        decomposed = unicodedata.normalize("NFKD", match.group())
+        word = "".join(c for c in decomposed if not unicodedata.combining(c))
+        word = re.sub(r"['’`]", "", word.casefold())
+        for part in _TOKEN.findall(word):
+            tokens.append(
+                (CANONICAL_ABBREVIATIONS.get(part, part), match.start(), match.end())
+            )
+    return tokens
+
+
+def _pattern_variants(value: str) -> set[tuple[str, ...]]:
+    tokens = tuple(token for token, _, _ in tokenize(value))
+    if not tokens:
+        return set()
+    variants = {tokens}
+    # "Otago Region" is usually written "Otago"
+    if len(tokens) > 1 and tokens[-1] == "region":
+        variants.add(tokens[:-1])
+    return {v for v in variants if len(v) > 1 or len(v[0]) >= MIN_TOKEN_LENGTH}
+
+
+def _deletions(key: str) -> set[str]:
+    return {key[:i] + key[i + 1 :] for i in range(len(key))}
+
+
+class PlaceScanner:
+    def __init__(self, vocabularies: dict[str, Iterable[str]]):
+        # pattern -> {field: vocabulary value}; a value spelled exactly as
+        # the pattern wins over one it is a variant of ("Otago Region")
+        self.patterns: dict[tuple[str, ...], dict[str, str]] = {}
+        exact: set[tuple[tuple[str, ...], str]] = set()
+        for field_name, values in vocabularies.items():
+            for value in values:
+                full = tuple(token for token, _, _ in tokenize(value))
+                for pattern in _pattern_variants(value):
+                    by_field = self.patterns.setdefault(pattern, {})
+                    if field_name not in by_field or (
+                        pattern == full and (pattern, field_name) not in exact
+                    ):
+                        by_field[field_name] = value
+                    if pattern == full:
+                        exact.add((pattern, field_name))
+        self._exact = exact
+        self.max_tokens = max((len(p) for p in self.patterns), default=0)
+
+        self._build_automaton()
+        self._build_typo_index()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    # -------------------
+    # Exact pass: Aho-Corasick over tokens
+    # -------------------
+    def _build_automaton(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._output: list[list[tuple[str, ...]]] = [[]]
+        for pattern in self.patterns:
+            state = 0
+            for token in pattern:
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][token] = nxt
+                    self._goto.append({})
+                    self._output.append([])
+                state = nxt
+            self._output[state].append(pattern)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(token, 0)
+                if self._fail[nxt] == nxt:
+                    self._fail[nxt] = 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def _exact_matches(self, tokens: list[str]) -> list[tuple[int, int, tuple]]:
+        """(first token, last token + 1, pattern) of every exact mention."""
+        matches = []
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for pattern in self._output[state]:
+                matches.append((i + 1 - len(pattern), i + 1, pattern))
+        return matches
+
+    # -------------------
+    # Typo pass: one edit away from a pattern
+    # -------------------
+    def _build_typo_index(self):
+        self._typo_index: dict[str, set[tuple[str, ...]]] = {}
+        for pattern in self.patterns:
+            key = " ".join(pattern)
+            if len(key) < MIN_TYPO_LENGTH:
+                continue
+            for variant in _deletions(key) | {key}:
+                self._typo_index.setdefault(variant, set()).add(pattern)
+
+    def _typo_match(self, key: str) -> Optional[tuple[tuple[str, ...], int]]:
+        candidates = set()
+        for variant in _deletions(key) | {key}:
+            candidates |= self._typo_index.get(variant, set())
+        best = None
+        for pattern in candidates:
+            d = distance(key, " ".join(pattern))
+            if d <= 1 and (best is None or d < best[1]):
+                best = (pattern, d)
+        return best
+
+    def _typo_matches(self, tokens: list[str], covered: list[bool]):
+        matches = []
+        for start in range(len(tokens)):
+            for end in range(start + 1, min(len(tokens), start + self.max_tokens) + 1):
+                if any(covered[start:end]):
+                    break
+                key = " ".join(tokens[start:end])
+                if len(key) < MIN_TYPO_LENGTH:
+                    continue
+                found = self._typo_match(key)
+                if found is not None:
+                    pattern, d = found
+                    score = round(100 * (1 - d / max(len(key), 1)))
+                    matches.append((start, end, pattern, score))
+        return matches
+
+    # -------------------
+    # Scan
+    # -------------------
+    def scan(self, text: str, typos: bool = True) -> list[PlaceMention]:
+        """
+        Every non-overlapping place mention in ``text``, in order. Longer
+        mentions win over the names they contain ("Palmerston North" over
+        "Palmerston"), and exact spellings over typos.
+        """
+        tokenized = tokenize(text)
+        tokens = [token for token, _, _ in tokenized]
+
+        candidates = [
+            (start, end, pattern, 100)
+            for start, end, pattern in self._exact_matches(tokens)
+        ]
+        covered = [False] * len(tokens)
+        for start, end, _, _ in candidates:
+            for i in range(start, end):
+                covered[i] = True
+        if typos:
+            candidates += self._typo_matches(tokens, covered)
+
+        chosen = []
+        taken = [False] * len(tokens)
+        for start, end, pattern, score in sorted(
+            candidates, key=lambda m: (-(m[1] - m[0]), -m[3], m[0])
+        ):
+            if any(taken[start:end]):
+                continue
+            for i in range(start, end):
+                taken[i] = True
+            chosen.append((start, end, pattern, score))
+
+        mentions = []
+        for start, end, pattern, score in sorted(chosen, key=lambda m: m[0]):
+            by_field = self.patterns[pattern]
+            fields, values = tuple(by_field), tuple(by_field.values())
+            value = next(
+                (v for f, v in by_field.items() if (pattern, f) in self._exact),
+                values[0],
+            )
+            char_start, char_end = tokenized[start][1], tokenized[end - 1][2]
+            mentions.append(
+                PlaceMention(
+                    char_start,
+                    char_end,
+                    text[char_start:char_end],
+                    value,
+                    fields,
+                    score,
+                    values,
+                )
+            )
+        return mentions
+
+
+# -------------------
+# Shared scanner, rebuilt when the vocabularies change
+# -------------------
+_lock = threading.Lock()
+_scanner: Optional[PlaceScanner] = None
+_scanner_sources: tuple = ()
+
+
+def _stale(sources: tuple) -> bool:
+    return len(sources) != len(_scanner_sources) or any(
+        a is not b for a, b in zip(sources, _scanner_sources)
+    )
+
+
+def get_place_scanner(
+    registry: VocabularyRegistry = vocabulary_registry,
+) -> Optional[PlaceScanner]:
+    """The scanner for the registry's current vocabularies, or None if empty."""
+    global _scanner, _scanner_sources
+    sources = tuple(registry.get(name) for name in PLACE_FIELDS)
+    if _stale(sources):
+        with _lock:
+            if _stale(sources):
+                _scanner = PlaceScanner(
+                    {
+                        name: vocabulary
+                        for name, vocabulary in zip(PLACE_FIELDS, sources)
+                        if vocabulary is not None
+                    }
+                )
+                _scanner_sources = sources
+    return _scanner if _scanner is not None and len(_scanner) else None
@@ -0,0 +1,114 @@
+# vector_db/prewarm_mplify.py
+"""
+Pre-populate the Mplify 150 parse cache for every address in the collection.
+
+    python -m vector_db.prewarm_mplify --concurrency 4
+
+Addresses already cached for the current chat model and prompt are skipped,
+so the job can be stopped and rerun at any time, and rerun after a prompt
+change to fill the new cache.
+"""
+
+import argparse
+import time
+from typing import Iterator, Optional
+
+from app.config import settings
+from app.database import init_db
+from app.services.mplify_cache import mplify_cache
+from app.services.qdrant_pool import get_qdrant_client
+from app.services.rag_service import (
+    MPLIFY_PROMPT_VERSION,
+    chain,
+    format_inputs,
+)
+
+
+def iter_address_pages(
+    client, collection_name: str, page_size: int
+) -> Iterator[list[str]]:
+    """Distinct normalized addresses of the collection, a scroll page at a time."""
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=["normalized_address"],
+            with_vectors=False,
+            timeout=settings.qdrant_scroll_timeout,
+        )
+        addresses = {
+            (point.payload or {}).get("normalized_address", "").strip()
+            for point in points
+        }
+        addresses.discard("")
+        yield sorted(addresses)
+        if offset is None:
+            return
+
+
+def prewarm(
+    collection_name: str,
+    page_size: int = 256,
+    concurrency: int = 4,
+    limit: Optional[int] = None,
+):
+    init_db()
+    client = get_qdrant_client()
+    model = settings.chat_model
+
+    started = time.monotonic()
+    seen = formatted = failed = 0
+    for addresses in iter_address_pages(client, collection_name, page_size):
+        seen += len(addresses)
+        todo = mplify_cache.missing(model, MPLIFY_PROMPT_VERSION, addresses)
+        if limit is not None:
+            todo = todo[: max(0, limit - formatted - failed)]
+        if todo:
+            outputs = chain.batch(
+                [format_inputs(address) for address in todo],
+                config={"max_concurrency": concurrency},
+                return_exceptions=True,
+            )
+            parsed = {
+                address: output
+                for address, output in zip(todo, outputs)
+                if isinstance(output, dict)
+            }
+            mplify_cache.put_many(model, MPLIFY_PROMPT_VERSION, parsed)
+            formatted += len(parsed)
+            failed += len(todo) - len(parsed)
+
+        elapsed = time.monotonic() - started
+        print(
+            f"{seen} addresses seen, {formatted} formatted, {failed} failed "
+            f"({formatted / elapsed if elapsed else 0:.1f}/s)"
+        )
+        if limit is not None and formatted + failed >= limit:
+            break
+    return formatted, failed
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collection", default=settings.collection_name)
+    parser.add_argument("--page-size", type=int, default=256)
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="parallel LLM requests"
+    )
+    parser.add_argument(
+        "--limit", type=int, help="stop after formatting this many addresses"
+    )
+    args = parser.parse_args(argv)
+
+    prewarm(
+        args.collection,
+        page_size=args.page_size,
+        concurrency=args.concurrency,
+        limit=args.limit,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 # qdrant_search_post.py
+import asyncio
 import json
 import os
 from dotenv import load_dotenv
-from qdrant_client import AsyncQdrantClient
-from qdrant_client.models import SearchParams
+from qdrant_client.models import QueryRequest, SearchParams
 from langchain_ollama import OllamaEmbeddings
+from app.services.embedding_batcher import get_embedding_batcher
+from app.services.embedding_cache import embedding_cache
+from app.services.qdrant_pool import get_async_qdrant_client, server_timeout
+from app.config import settings
+from app.concurrency import gather_bounded, raise_if_all_failed
 
 from vector_db.address_extractor import run_workflow
 
@@ -15,17 +20,19 @@ from vector_db.address_extractor import run_workflow
 load_dotenv()
 
 OLLAMA_URL = os.getenv("OLLAMA_URL")
-QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_COLLECTION = os.getenv("COLLECTION_NAME")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+SEARCH_CONCURRENCY = int(os.getenv("QDRANT_SEARCH_CONCURRENCY", "8"))
+SEARCH_TIMEOUT = settings.qdrant_search_timeout
 
-client = AsyncQdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=60)
+client = get_async_qdrant_client()
 
 
 # -------------------
 # Ollama Embedder
 # -------------------
-embedder = OllamaEmbeddings(base_url=OLLAMA_URL, model="nomic-embed-text:latest")
+EMBEDDING_MODEL = "nomic-embed-text:latest"
+embedder = OllamaEmbeddings(base_url=OLLAMA_URL, model=EMBEDDING_MODEL)
+embedding_batcher = get_embedding_batcher(OLLAMA_URL, EMBEDDING_MODEL)
 
 
 def clean_qdrant_response(search_result):
@@ -57,13 +64,18 @@ def clean_qdrant_response(search_result):
 
 
 def get_embedding(text: str):
-    """Get embedding vector for the query text."""
-    return embedder.embed_query(text)
+    """Get embedding vector for the query text (cached across call sites)."""
+    return embedding_cache.get_or_compute(EMBEDDING_MODEL, text, embedder.embed_query)
+
+
+async def aget_embedding(text: str):
+    """Non-blocking get_embedding; concurrent calls are batched together."""
+    return await embedding_batcher.embed(text)
 
 
 async def search_normalized_address(query: str, top_k: int = 1):
     """Search Qdrant collection using HTTP POST request."""
-    query_vector = get_embedding(query)
+    query_vector = await aget_embedding(query)
     search_result = await client.query_points(
         collection_name="new-zealand",
         query=query_vector,  # type: ignore
@@ -71,6 +83,7 @@ async def search_normalized_address(query: str, top_k: int = 1):
         with_vectors=False,
         limit=top_k,
         search_params=SearchParams(hnsw_ef=128),
+        timeout=server_timeout(settings.qdrant_search_timeout),
     )
     cleaned = clean_qdrant_response(search_result)
     print(json.dumps(cleaned, indent=2))
@@ -78,25 +91,72 @@ async def search_normalized_address(query: str, top_k: int = 1):
     return cleaned
 
 
+async def search_normalized_addresses(queries: list[tuple[str, int]]):
+    """
+    Unfiltered search for several (query, top_k) pairs in one
+    query_batch_points round trip; results come back in the same order.
+    """
+    # Embedded concurrently, so the batcher sends them to Ollama together
+    query_vectors = await asyncio.gather(*(aget_embedding(q) for q, _ in queries))
+    requests = [
+        QueryRequest(
+            query=query_vector,
+            limit=top_k,
+            params=SearchParams(hnsw_ef=128),
+            with_payload=True,
+            with_vector=False,
+        )
+        for query_vector, (_, top_k) in zip(query_vectors, queries)
+    ]
+    responses = await client.query_batch_points(
+        collection_name="new-zealand",
+        requests=requests,
+        timeout=server_timeout(settings.qdrant_search_timeout),
+    )
+    return [clean_qdrant_response(response) for response in responses]
+
+
 # -------------------
 # Test
 async def vector_search(text: str, top_k: int = 2):
     # 1️⃣ Extract addresses from text
-    extracted_addresses = run_workflow(text)
+    # spaCy parsing is CPU-bound; keep it off the event loop
+    extracted_addresses = await asyncio.to_thread(run_workflow, text)
     print(extracted_addresses)
     all_results = []
     query_result_array = []
 
-    # Iterate over each extracted address
-    for addr in extracted_addresses:
-        print(f"Searching Qdrant for address: {addr}")
-        results = await search_normalized_address(addr, top_k=top_k)
+    # Search every extracted address and the full text in one round trip
+    print(f"Searching Qdrant for addresses: {extracted_addresses}")
+    queries = [(addr, top_k) for addr in extracted_addresses] + [(text, 2)]
+    try:
+        responses = await asyncio.wait_for(
+            search_normalized_addresses(queries), SEARCH_TIMEOUT
+        )
+    except Exception as e:
+        # Fall back to concurrent single searches
+        print(f"Batched Qdrant search failed: {e!r}")
+        responses = raise_if_all_failed(
+            await gather_bounded(
+                (search_normalized_address(q, top_k=k) for q, k in queries),
+                limit=SEARCH_CONCURRENCY,
+                timeout=SEARCH_TIMEOUT,
+                return_exceptions=True,
+            ),
+            "Qdrant searches",
+        )
+    *address_results, query_result = responses
+
+    for addr, results in zip(extracted_addresses, address_results):
+        if isinstance(results, BaseException):
+            print(f"Qdrant search failed for {addr}: {results!r}")
+            continue
         all_results.append({"query": addr, "payload": results})
-    query_result = await search_normalized_address(text, top_k=2)
-    query_result_array.append(
-        {
-            "query": text,
-            "payload": query_result,
-        }
-    )
+    if not isinstance(query_result, BaseException):
+        query_result_array.append(
+            {
+                "query": text,
+                "payload": query_result,
+            }
+        )
     return all_results, query_result_array